@@ -1,15 +1,65 @@
+import asyncio
+import logging
+import os
+import time
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 import uvicorn
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+# Every Gemini-backed service needs this key. Say so up front, before the routers import and
+# initialize the SDK clients; each service then handles the missing key as it always has
+if not os.getenv("GOOGLE_API_KEY"):
+    logger.error("GOOGLE_API_KEY environment variable not set. Add it to backend/.env or the environment.")
+
+# Development aid: with WORKFLOW_DEBUG=1 set, asyncio debug mode logs any callback that holds
+# the event loop longer than SLOW_CALLBACK_SECONDS, and a probe task warns when the loop wakes
+# it more than LOOP_LAG_WARN_SECONDS late (i.e. something synchronous blocked the loop)
+WORKFLOW_DEBUG = os.getenv("WORKFLOW_DEBUG") == "1"
+SLOW_CALLBACK_SECONDS = 0.1
+LOOP_LAG_PROBE_INTERVAL = 0.01
+LOOP_LAG_WARN_SECONDS = 0.05
+
+async def _probe_loop_lag():
+    while True:
+        started = time.perf_counter()
+        await asyncio.sleep(LOOP_LAG_PROBE_INTERVAL)
+        lag = time.perf_counter() - started - LOOP_LAG_PROBE_INTERVAL
+        if lag > LOOP_LAG_WARN_SECONDS:
+            logger.warning("Event loop was blocked for %.3fs", lag)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    try:
+        from services.rag_service import configure_faiss_threads
+        configure_faiss_threads()
+    except ImportError:
+        logger.info("RAG service not available, skipping FAISS thread configuration.")
+    loop_lag_probe = None
+    if WORKFLOW_DEBUG:
+        loop = asyncio.get_running_loop()
+        loop.set_debug(True)
+        loop.slow_callback_duration = SLOW_CALLBACK_SECONDS
+        loop_lag_probe = asyncio.create_task(_probe_loop_lag())
+        logger.info("Event loop debugging enabled (slow callback threshold %.2fs)", SLOW_CALLBACK_SECONDS)
+    try:
+        yield
+    finally:
+        if loop_lag_probe is not None:
+            loop_lag_probe.cancel()
+
 app = FastAPI(
     title="Competitive Intelligence Agent",
     description="AI-powered competitive intelligence platform",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Configure CORS
@@ -21,6 +71,22 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+class StreamingAwareGZipMiddleware(GZipMiddleware):
+    """GZip middleware that leaves the streaming endpoints (paths ending in /stream) alone.
+
+    The compressor doesn't flush per chunk, so gzipping the insight SSE stream or the
+    chat token stream would hold every event back until the response ends.
+    """
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["path"].rstrip("/").endswith("/stream"):
+            await self.app(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
+
+# Compress larger responses (news articles, competitor research) for clients that accept gzip
+app.add_middleware(StreamingAwareGZipMiddleware, minimum_size=1000)
+
 # Import routers
 from routers import company, news, insights, competitors, chat
 
@@ -1,8 +1,9 @@
 from fastapi import APIRouter, HTTPException, Body
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 import logging
 
-from services.rag_service import rag_service # Import the instantiated service
+from services.rag_service import get_rag_service
 from services.database import db
 
 router = APIRouter()
@@ -26,8 +27,24 @@ async def handle_chat_query(company_id: str, chat_query: ChatQuery):
         raise HTTPException(status_code=404, detail="Company not found")
 
     try:
-        answer = await rag_service.ask_question(chat_query.query, company_id)
+        answer = await get_rag_service().ask_question(chat_query.query, company_id)
         return ChatResponse(answer=answer)
     except Exception as e:
         logger.error(f"Error handling chat query for company {company_id}: {e}")
-        raise HTTPException(status_code=500, detail=f"Failed to process chat query: {str(e)}") 
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Failed to process chat query: {str(e)}")
+
+@router.post("/{company_id}/stream")
+async def handle_chat_query_stream(company_id: str, chat_query: ChatQuery):
+    """Handles user queries using the RAG system, streaming the answer as plain text while it is generated."""
+    if not chat_query.query:
+        raise HTTPException(status_code=400, detail="Query cannot be empty.")
+
+    # Check if company exists
+    company = await db.get_company(company_id)
+    if not company:
+        raise HTTPException(status_code=404, detail="Company not found")
+
+    return StreamingResponse(
+        get_rag_service().astream_answer(chat_query.query, company_id),
+        media_type="text/plain; charset=utf-8"
+    )
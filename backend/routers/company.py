@@ -1,10 +1,19 @@
-from fastapi import APIRouter, HTTPException, BackgroundTasks
+from fastapi import APIRouter, HTTPException, BackgroundTasks, Query, Header, Response
 from fastapi.responses import JSONResponse
 from pydantic import BaseModel
+import asyncio
+import hashlib
+import json
 import logging
+import os
 from typing import Optional, List, Dict, Any
 import uuid
 
+try:
+    from pyinstrument import Profiler # Optional: async-aware profiling of the background pipeline
+except ImportError:
+    Profiler = None
+
 from services.database import db
 from services.gemini_service import GeminiService
 
@@ -14,6 +23,46 @@ logger = logging.getLogger(__name__)
 # Initialize services
 gemini_service = GeminiService()
 
+# Long-poll support: company_id -> {"details"/"competitors": Event} for GETs waiting on the
+# background task. Signalling sets the event and removes it, so a later run starts with a fresh one
+_ready_events: Dict[str, Dict[str, asyncio.Event]] = {}
+
+# Upper bound for the wait_ms query parameter on the GET endpoints
+MAX_WAIT_MS = 30000
+
+# Directory for per-run pyinstrument HTML profiles of process_company_data; unset disables profiling
+PIPELINE_PROFILE_DIR = os.getenv("PIPELINE_PROFILE_DIR")
+
+def _ready_event(company_id: str, kind: str) -> asyncio.Event:
+    events = _ready_events.get(company_id)
+    if events is None:
+        events = _ready_events[company_id] = {}
+    event = events.get(kind)
+    if event is None:
+        event = events[kind] = asyncio.Event()
+    return event
+
+def _signal_ready(company_id: str, kind: str):
+    """Release every GET waiting for `kind` of this company and forget the event."""
+    events = _ready_events.get(company_id)
+    if events is None:
+        return
+    event = events.pop(kind, None)
+    if event is not None:
+        event.set()
+    if not events:
+        del _ready_events[company_id]
+
+async def _wait_until_ready(company_id: str, kind: str, wait_ms: int):
+    """Wait up to wait_ms for the background task to signal `kind` for this company."""
+    await _wait_for_event(_ready_event(company_id, kind), wait_ms)
+
+async def _wait_for_event(event: asyncio.Event, wait_ms: int):
+    try:
+        await asyncio.wait_for(event.wait(), wait_ms / 1000)
+    except asyncio.TimeoutError:
+        pass
+
 class CompanyRequest(BaseModel):
     name: str
 
@@ -79,14 +128,20 @@ async def analyze_company(company_request: CompanyRequest, background_tasks: Bac
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/{company_id}", response_model=CompanyDetailsResponse)
-async def get_company_details(company_id: str):
+async def get_company_details(company_id: str, wait_ms: Optional[int] = Query(None, ge=0, le=MAX_WAIT_MS)):
     """
     Get company details (name, description, industry, welcome message) by ID.
+    With wait_ms, a request made while the analysis is still running is held until the
+    details are stored or wait_ms elapses (long polling).
     """
     try:
         company = await db.get_company(company_id)
         if not company:
             raise HTTPException(status_code=404, detail="Company not found")
+
+        if wait_ms and not company.get("description"):
+            await _wait_until_ready(company_id, "details", wait_ms)
+            company = await db.get_company(company_id)
         
         # Return details including potentially generated welcome message
         return CompanyDetailsResponse(
@@ -103,48 +158,155 @@ async def get_company_details(company_id: str):
         logger.error(f"Error in get_company_details: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+async def _competitors_payload(company: Dict[str, Any]) -> Dict[str, Any]:
+    competitors = await db.get_competitors_by_company(company["id"])
+    
+    competitor_list = []
+    for competitor in competitors:
+        competitor_list.append({
+            "id": competitor["id"],
+            "name": competitor["name"],
+            "company_id": competitor["company_id"],
+            "description": competitor.get("description"),
+            "strengths": competitor.get("strengths", []),
+            "weaknesses": competitor.get("weaknesses", []),
+            "deep_research_status": competitor.get("deep_research_status"),
+            "deep_research_markdown": competitor.get("deep_research_markdown")
+        })
+    
+    return {
+        "company_id": company["id"],
+        "company_name": company["name"],
+        "competitors": competitor_list
+    }
+
+def _payload_etag(payload: Dict[str, Any]) -> str:
+    return '"' + hashlib.blake2b(json.dumps(payload, sort_keys=True).encode("utf-8"), digest_size=16).hexdigest() + '"'
+
 @router.get("/{company_id}/competitors", response_model=CompetitorsListResponse)
-async def get_company_competitors(company_id: str):
+async def get_company_competitors(
+    company_id: str,
+    wait_ms: Optional[int] = Query(None, ge=0, le=MAX_WAIT_MS),
+    if_none_match: Optional[str] = Header(None)
+):
     """
     Get all competitors for a specific company.
+    Responses carry an ETag. With wait_ms, a request made before any competitors are
+    stored, or whose If-None-Match still matches (nothing changed since the client's last
+    response), is held until the competitor list changes or wait_ms elapses (long polling).
+    An unchanged list is answered with an empty 304.
     """
     try:
         company = await db.get_company(company_id)
         if not company:
             raise HTTPException(status_code=404, detail="Company not found")
         
-        competitors = await db.get_competitors_by_company(company_id)
+        # Both waits below share one wait_ms budget, so the request is never held longer than that
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + (wait_ms or 0) / 1000
+        # Take the change event before reading, so a change in between isn't missed
+        changed = db.competitor_change_event(company_id) if wait_ms else None
+        try:
+            payload = await _competitors_payload(company)
+            if wait_ms and not payload["competitors"]:
+                await _wait_until_ready(company_id, "competitors", wait_ms)
+                db.release_competitor_change_event(company_id, changed)
+                changed = db.competitor_change_event(company_id)
+                payload = await _competitors_payload(company)
+            
+            etag = _payload_etag(payload)
+            remaining_ms = (deadline - loop.time()) * 1000
+            if if_none_match == etag and wait_ms and remaining_ms > 0:
+                await _wait_for_event(changed, remaining_ms)
+                payload = await _competitors_payload(company)
+                etag = _payload_etag(payload)
+        finally:
+            if changed is not None:
+                db.release_competitor_change_event(company_id, changed)
+        if if_none_match == etag:
+            return Response(status_code=304, headers={"ETag": etag})
         
-        competitor_list = []
-        for competitor in competitors:
-            competitor_list.append({
-                "id": competitor["id"],
-                "name": competitor["name"],
-                "company_id": competitor["company_id"],
-                "description": competitor.get("description"),
-                "strengths": competitor.get("strengths", []),
-                "weaknesses": competitor.get("weaknesses", []),
-                "deep_research_status": competitor.get("deep_research_status"),
-                "deep_research_markdown": competitor.get("deep_research_markdown")
-            })
+        return JSONResponse(payload, headers={"ETag": etag})
         
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error in get_company_competitors: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/{company_id}/full")
+async def get_company_full(company_id: str):
+    """
+    Get everything stored for a company in one response: details, competitors,
+    news per competitor name and insights.
+    This is a read-only snapshot; unlike the individual endpoints it never waits,
+    fetches news or generates insights.
+    """
+    try:
+        details = await get_company_details(company_id, wait_ms=None)
+        competitors = await _competitors_payload(await db.get_company(company_id))
+
+        news = {}
+        for competitor in competitors["competitors"]:
+            news[competitor["name"]] = [
+                {
+                    "title": article["title"],
+                    "source": article["source"],
+                    "url": article.get("url"),
+                    "published_at": article.get("published_at", ""),
+                    "content": article["content"]
+                }
+                for article in await db.get_news_by_competitor(competitor["id"])
+            ]
+
+        insights = [
+            {
+                "id": insight["id"],
+                "company_id": insight["company_id"],
+                "competitor_id": insight.get("competitor_id"),
+                "content": insight["content"],
+                "source": insight.get("source", "ai-generated")
+            }
+            for insight in await db.get_insights_by_company(company_id)
+        ]
+
         return {
-            "company_id": company_id,
-            "company_name": company["name"],
-            "competitors": competitor_list
+            "details": details,
+            "competitors": competitors,
+            "news": news,
+            "insights": {
+                "company_id": company_id,
+                "company_name": details.name,
+                "insights": insights
+            }
         }
-        
+
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error in get_company_competitors: {e}")
+        logger.error(f"Error in get_company_full: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 async def process_company_data(company_id: str):
     """
     Background task to process company details, competitors, and news.
     Then triggers insight generation.
+    With PIPELINE_PROFILE_DIR set (and pyinstrument installed), each run is profiled with
+    await time attributed to the step that awaited it, and saved as an HTML report.
     """
+    if not PIPELINE_PROFILE_DIR or Profiler is None:
+        await _process_company_data(company_id)
+        return
+
+    profiler = Profiler(async_mode="enabled")
+    with profiler:
+        await _process_company_data(company_id)
+    os.makedirs(PIPELINE_PROFILE_DIR, exist_ok=True)
+    profile_path = os.path.join(PIPELINE_PROFILE_DIR, f"process_company_data_{company_id}.html")
+    profiler.write_html(profile_path)
+    logger.info(f"Saved pipeline profile to {profile_path}")
+
+async def _process_company_data(company_id: str):
     try:
         from routers.insights import generate_company_insights
         
@@ -155,25 +317,36 @@ async def process_company_data(company_id: str):
         
         logger.info(f"Starting background data processing for {company['name']} (ID: {company_id})")
         
-        # 1. Analyze company details (description, industry, welcome message)
-        logger.info(f"Analyzing details for {company['name']}...")
-        company_analysis = await gemini_service.analyze_company(company["name"], max_retries=1)
-        await db.update_company(
-            company_id=company_id,
-            description=company_analysis.get("description"),
-            industry=company_analysis.get("industry"),
-            welcome_message=company_analysis.get("welcome_message")
-        )
-        
-        # Re-fetch company object to ensure it has the updated details for competitor identification
-        company = await db.get_company(company_id)
-        if not company:
-            logger.error(f"Company disappeared after update: {company_id}")
-            return
-
-        # 2. Identify competitors
+        # Competitor identification only needs the name, so it runs alongside the analysis
+        # below instead of waiting for it
         logger.info(f"Identifying competitors for {company['name']}...")
-        competitors_data = await gemini_service.identify_competitors(company["name"])
+        competitors_task = asyncio.create_task(gemini_service.identify_competitors(company["name"]))
+        try:
+            # 1. Analyze company details (description, industry, welcome message)
+            logger.info(f"Analyzing details for {company['name']}...")
+            company_analysis = await gemini_service.analyze_company(company["name"], max_retries=1)
+            await db.update_company(
+                company_id=company_id,
+                description=company_analysis.get("description"),
+                industry=company_analysis.get("industry"),
+                welcome_message=company_analysis.get("welcome_message")
+            )
+            _signal_ready(company_id, "details")
+            
+            # Re-fetch company object to ensure it has the updated details for competitor identification
+            company = await db.get_company(company_id)
+            if not company:
+                logger.error(f"Company disappeared after update: {company_id}")
+                return
+
+            # 2. Identify competitors (started above)
+            competitors_data = await competitors_task
+        finally:
+            # Don't leave the task unawaited if anything above failed or returned early. This only
+            # drops the result: the blocking Gemini request already running in its executor thread
+            # still runs to completion.
+            if not competitors_task.done():
+                competitors_task.cancel()
         
         # Log the results clearly
         if not competitors_data or not competitors_data.get('competitors'):
@@ -183,10 +356,14 @@ async def process_company_data(company_id: str):
         
         # 3. Store competitors in database
         logger.info(f"Storing {len(competitors_data.get('competitors', []))} competitors...")
+        # Check which competitors already exist for this company once, instead of per competitor
+        existing_names = {c['name'].lower() for c in await db.get_competitors_by_company(company_id)}
         for competitor in competitors_data.get("competitors", []):
-            # Check if competitor already exists for this company before creating
-            existing_competitors = await db.get_competitors_by_company(company_id)
-            if not any(c['name'].lower() == competitor['name'].lower() for c in existing_competitors):
+            if competitor['name'].lower() in existing_names:
+                logger.info(f"Competitor {competitor['name']} already exists for {company['name']}, skipping creation.")
+                continue
+            existing_names.add(competitor['name'].lower())
+            try:
                 await db.create_competitor(
                     name=competitor["name"],
                     company_id=company_id,
@@ -194,8 +371,9 @@ async def process_company_data(company_id: str):
                     strengths=competitor.get("strengths"),
                     weaknesses=competitor.get("weaknesses")
                 )
-            else:
-                logger.info(f"Competitor {competitor['name']} already exists for {company['name']}, skipping creation.")
+            except Exception as e:
+                logger.error(f"Failed to store competitor {competitor['name']}: {e}")
+        _signal_ready(company_id, "competitors")
 
         # 4. Generate insights (handled by insights router)
         logger.info(f"Triggering insight generation for {company['name']}...")
@@ -203,9 +381,9 @@ async def process_company_data(company_id: str):
         
         # 5. Update RAG index with all data
         try:
-            from services.rag_service import rag_service
+            from services.rag_service import get_rag_service
             logger.info(f"Updating RAG index for {company['name']}...")
-            await rag_service.update_rag_index(company_id)
+            await get_rag_service().update_rag_index(company_id)
         except ImportError:
             logger.info("RAG service not available, skipping index update.")
 
@@ -213,6 +391,10 @@ async def process_company_data(company_id: str):
 
     except Exception as e:
         logger.error(f"Error in process_company_data background task for {company_id}: {e}")
+    finally:
+        # Release any long-polling requests even if processing failed part way
+        _signal_ready(company_id, "details")
+        _signal_ready(company_id, "competitors")
 
 async def refresh_company_data(company_id: str):
     """
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, HTTPException, Depends, BackgroundTasks
+from fastapi import APIRouter, HTTPException, Depends, BackgroundTasks, Header, Response
 from fastapi.responses import StreamingResponse, HTMLResponse, FileResponse, JSONResponse
 from typing import List, Optional, Dict, Any
 from pydantic import BaseModel
@@ -12,6 +12,7 @@ import asyncio  # Import asyncio
 import re  # Import regex
 import requests # Import requests for Supervity call
 import json # Import json for Supervity payload
+import hashlib
 import subprocess # Import subprocess for curl command execution
 
 from services.database import db
@@ -65,6 +66,7 @@ class ResearchResponse(BaseModel):
     message: str
     competitor_id: str
     status: str
+    code: str  # "STARTED" or "ALREADY_RUNNING", for clients that shouldn't parse the message
 
 class MultiResearchRequest(BaseModel):
     competitor_ids: List[str]
@@ -74,6 +76,17 @@ class MultiResearchResponse(BaseModel):
     competitor_ids: List[str]
     status: str
 
+class ResearchStatus(BaseModel):
+    id: str
+    name: str
+    deep_research_status: str
+
+class ResearchStatusBatchResponse(BaseModel):
+    statuses: List[ResearchStatus]
+
+class ResearchResult(ResearchStatus):
+    deep_research_markdown: Optional[str] = None
+
 # Mock database
 competitors_db = []
 current_id = 1
@@ -142,7 +155,8 @@ async def trigger_deep_research(competitor_id: str, background_tasks: Background
         return ResearchResponse(
             message="Deep research is already in progress.",
             competitor_id=competitor_id,
-            status=current_status
+            status=current_status,
+            code="ALREADY_RUNNING"
         )
 
     # Update status to pending
@@ -153,7 +167,8 @@ async def trigger_deep_research(competitor_id: str, background_tasks: Background
     return ResearchResponse(
         message="Deep research initiated.",
         competitor_id=competitor_id,
-        status="pending"
+        status="pending",
+        code="STARTED"
     )
 
 @router.post("/deep-research/multiple", response_model=MultiResearchResponse)
@@ -167,8 +182,9 @@ async def trigger_multiple_deep_research(request: MultiResearchRequest, backgrou
     invalid_ids = []
     company_id_for_rag = None  # To store the company ID for the final RAG update
     
+    competitors_by_id = await db.get_competitors_by_ids(request.competitor_ids)
     for competitor_id in request.competitor_ids:
-        competitor = await db.get_competitor(competitor_id)
+        competitor = competitors_by_id.get(competitor_id)
         if not competitor:
             invalid_ids.append(competitor_id)
         else:
@@ -209,9 +225,41 @@ async def trigger_multiple_deep_research(request: MultiResearchRequest, backgrou
         status="pending"  # Overall status is pending as tasks are running/queued
     )
 
+@router.post("/status/batch", response_model=ResearchStatusBatchResponse)
+async def get_research_status_batch(request: MultiResearchRequest):
+    """Returns just the deep research status of the requested competitors, without the markdown."""
+    statuses = []
+    competitors_by_id = await db.get_competitors_by_ids(request.competitor_ids)
+    for competitor_id in request.competitor_ids:
+        competitor = competitors_by_id.get(competitor_id)
+        if competitor:
+            statuses.append(ResearchStatus(
+                id=competitor_id,
+                name=competitor["name"],
+                deep_research_status=competitor.get("deep_research_status", "not_started")
+            ))
+    return ResearchStatusBatchResponse(statuses=statuses)
+
+@router.get("/{competitor_id}/deep-research", response_model=ResearchResult)
+async def get_deep_research(competitor_id: str):
+    """Returns the deep research status and markdown for a single competitor."""
+    competitor = await db.get_competitor(competitor_id)
+    if not competitor:
+        raise HTTPException(status_code=404, detail="Competitor not found")
+    return ResearchResult(
+        id=competitor_id,
+        name=competitor["name"],
+        deep_research_status=competitor.get("deep_research_status", "not_started"),
+        deep_research_markdown=competitor.get("deep_research_markdown")
+    )
+
 @router.get("/{competitor_id}/deep-research/download")
-async def download_deep_research_pdf(competitor_id: str):
-    """Downloads the deep research report as a PDF."""
+async def download_deep_research_pdf(competitor_id: str, if_none_match: Optional[str] = Header(None)):
+    """Downloads the deep research report as a PDF.
+
+    The ETag is derived from the report markdown, so a client that already has this report
+    gets an empty 304 without the PDF being rendered again.
+    """
     competitor = await db.get_competitor(competitor_id)
     if not competitor:
         raise HTTPException(status_code=404, detail="Competitor not found")
@@ -226,6 +274,13 @@ async def download_deep_research_pdf(competitor_id: str):
             detail_msg = f"Deep research for {competitor['name']} resulted in an error. Cannot download report."
         raise HTTPException(status_code=404, detail=detail_msg)
 
+    # The rendered PDF carries today's date, so the date is part of the ETag too
+    current_date_str = datetime.now().strftime('%Y%m%d')
+    etag_source = f"{competitor['name']}\n{current_date_str}\n{markdown_content}"
+    etag = '"' + hashlib.blake2b(etag_source.encode("utf-8"), digest_size=16).hexdigest() + '"'
+    if if_none_match == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+
     try:
         # Generate PDF directly
         title = f"Deep Research: {competitor['name']}"
@@ -239,7 +294,7 @@ async def download_deep_research_pdf(competitor_id: str):
         return StreamingResponse(
             pdf_buffer,
             media_type='application/pdf',
-            headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+            headers={'Content-Disposition': f'attachment; filename="{filename}"', 'ETag': etag}
         )
     
     except Exception as e:
@@ -247,8 +302,12 @@ async def download_deep_research_pdf(competitor_id: str):
         raise HTTPException(status_code=500, detail=f"Failed to generate PDF report: {str(e)}")
 
 @router.post("/deep-research/multiple/download")
-async def download_multiple_deep_research_pdf(request: MultiResearchRequest):
-    """Downloads a combined research report for multiple competitors as a PDF."""
+async def download_multiple_deep_research_pdf(request: MultiResearchRequest, if_none_match: Optional[str] = Header(None)):
+    """Downloads a combined research report for multiple competitors as a PDF.
+
+    Like the single report, the ETag covers everything the PDF is built from, so an unchanged
+    report is answered with a 304 before it is rendered.
+    """
     if not request.competitor_ids:
         raise HTTPException(status_code=400, detail="No competitor IDs provided")
     
@@ -258,8 +317,9 @@ async def download_multiple_deep_research_pdf(request: MultiResearchRequest):
     company_name = "Company" # Default name
     first_company_id = None
     
+    competitors_by_id = await db.get_competitors_by_ids(request.competitor_ids)
     for competitor_id in request.competitor_ids:
-        competitor = await db.get_competitor(competitor_id)
+        competitor = competitors_by_id.get(competitor_id)
         if not competitor:
             raise HTTPException(status_code=404, detail=f"Competitor not found: {competitor_id}")
         
@@ -286,6 +346,12 @@ async def download_multiple_deep_research_pdf(request: MultiResearchRequest):
     if not_completed_or_error:
         logger.warning(f"Generating combined report, but research is not ready for: {', '.join(not_completed_or_error)}")
     
+    current_date_str = datetime.now().strftime('%Y%m%d')
+    etag_source = "\n".join([company_name, current_date_str] + [f"{comp['name']}\n{comp['deep_research_markdown']}" for comp in completed_competitors_data])
+    etag = '"' + hashlib.blake2b(etag_source.encode("utf-8"), digest_size=16).hexdigest() + '"'
+    if if_none_match == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+
     # Create temp markdown files for each competitor
     temp_files = []
     try:
@@ -305,7 +371,6 @@ async def download_multiple_deep_research_pdf(request: MultiResearchRequest):
             report_internal_title += title_suffix
 
         # --- Generate Filename ---
-        current_date_str = datetime.now().strftime('%Y%m%d')
         # Sanitize company name for filename
         safe_company_name = re.sub(r'[^\w\-]+', '_', company_name) # Replace non-alphanumeric/- with _
         filename = f"{safe_company_name}_Multi_Competitor_Report_{current_date_str}.pdf"
@@ -322,7 +387,7 @@ async def download_multiple_deep_research_pdf(request: MultiResearchRequest):
         return StreamingResponse(
             pdf_buffer,
             media_type='application/pdf',
-            headers={'Content-Disposition': f'attachment; filename="{filename}"'} # Use the new filename here
+            headers={'Content-Disposition': f'attachment; filename="{filename}"', 'ETag': etag} # Use the new filename here
         )
     
     except Exception as e:
@@ -450,9 +515,9 @@ async def run_multiple_deep_research_concurrently(competitor_ids: List[str], com
     # Trigger RAG Index Update ONCE after all tasks are done
     if company_id_for_rag:
         try:
-            from services.rag_service import rag_service
+            from services.rag_service import get_rag_service
             logger.info(f"[Multi Research Task] Triggering RAG index update for company {company_id_for_rag} after batch research completion.")
-            await rag_service.update_rag_index(company_id_for_rag)
+            await get_rag_service().update_rag_index(company_id_for_rag)
             logger.info(f"[Multi Research Task] RAG index update triggered successfully for {company_id_for_rag}.")
         except ImportError:
             logger.info("[Multi Research Task] RAG service not available, skipping index update.")
@@ -1,5 +1,8 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
+import json
+import hashlib
 import logging
 from typing import List, Optional, Dict, Any
 import asyncio  # Import asyncio
@@ -14,6 +17,10 @@ logger = logging.getLogger(__name__)
 # Initialize services
 gemini_service = GeminiService()
 
+# Article text beyond this many characters is left out of the insights prompt; the opening
+# of an article carries the news, and the cap keeps prompt size (and token cost) bounded
+INSIGHT_NEWS_CONTENT_CHARS = 2000
+
 class InsightBase(BaseModel):
     content: str
     source: str = "ai-generated"
@@ -29,9 +36,20 @@ class CompanyInsightsResponse(BaseModel):
     insights: List[InsightResponse]
 
 @router.get("/company/{company_id}", response_model=CompanyInsightsResponse)
-async def get_company_insights(company_id: str):
+async def get_company_insights(company_id: str, request: Request):
     """
     Get insights for a specific company.
+    Responses carry an ETag; a request whose If-None-Match matches it gets an empty 304.
+    """
+    insights = await build_company_insights(company_id)
+    etag = '"' + hashlib.blake2b(json.dumps(insights, sort_keys=True).encode("utf-8"), digest_size=16).hexdigest() + '"'
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    return JSONResponse(insights, headers={"ETag": etag})
+
+async def build_company_insights(company_id: str):
+    """
+    Build the insights response for a company, generating insights if none exist.
     """
     try:
         # Get company info
@@ -70,6 +88,28 @@ async def get_company_insights(company_id: str):
         logger.error(f"Error in get_company_insights: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/company/{company_id}/stream")
+async def stream_company_insights(company_id: str):
+    """
+    Server-Sent Events variant of get_company_insights.
+    Holds the connection open while insights are generated and sends them as a single
+    'insights' event, so clients don't have to poll.
+    """
+    company = await db.get_company(company_id)
+    if not company:
+        raise HTTPException(status_code=404, detail="Company not found")
+
+    async def event_stream():
+        # Comment line flushes the response headers immediately while generation runs
+        yield ": generating\n\n"
+        try:
+            insights = await build_company_insights(company_id)
+            yield f"event: insights\ndata: {json.dumps(insights)}\n\n"
+        except HTTPException as e:
+            yield f"event: error\ndata: {json.dumps({'status_code': e.status_code, 'detail': e.detail})}\n\n"
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
 @router.post("/company/{company_id}/refresh", response_model=CompanyInsightsResponse)
 async def refresh_company_insights(company_id: str):
     """
@@ -134,18 +174,19 @@ async def generate_company_insights(company_id: str, force: bool = False):
             logger.warning(f"No competitors found for company: {company['name']} to generate insights from.")
             return
 
-        # Identify which competitors need news fetching
-        competitors_to_fetch_news = []
-        for competitor in competitors:
-            news_articles = await db.get_news_by_competitor(competitor["id"])
-            if not news_articles:
-                competitors_to_fetch_news.append(competitor["id"])
+        # Read each competitor's stored news once; only competitors without any need fetching
+        news_lists = await asyncio.gather(*(db.get_news_by_competitor(competitor["id"]) for competitor in competitors))
+        news_by_competitor = {competitor["id"]: articles for competitor, articles in zip(competitors, news_lists)}
+        competitors_to_fetch_news = [comp_id for comp_id, articles in news_by_competitor.items() if not articles]
 
         # Fetch news concurrently for competitors that need it
         if competitors_to_fetch_news:
             logger.info(f"Fetching news concurrently for {len(competitors_to_fetch_news)} competitors for insight generation...")
             fetch_tasks = [fetch_and_store_competitor_news(comp_id) for comp_id in competitors_to_fetch_news]
             await asyncio.gather(*fetch_tasks)
+            # Re-read just the competitors whose news was fetched above
+            fetched_lists = await asyncio.gather(*(db.get_news_by_competitor(comp_id) for comp_id in competitors_to_fetch_news))
+            news_by_competitor.update(zip(competitors_to_fetch_news, fetched_lists))
             logger.info("Concurrent news fetching for insights completed.")
         else:
             logger.info("All competitors already have news stored, skipping news fetch for insights.")
@@ -163,15 +204,15 @@ async def generate_company_insights(company_id: str, force: bool = False):
                 "weaknesses": competitor["weaknesses"]
             })
             
-            # Get all news for this competitor (whether new or old)
-            news_articles = await db.get_news_by_competitor(competitor["id"])
+            # All news for this competitor (whether new or old)
+            news_articles = news_by_competitor[competitor["id"]]
             
             # Add news to the data
             if news_articles:
                 news_data[competitor["name"]] = [
                     {
                         "title": article["title"],
-                        "content": article["content"],
+                        "content": article["content"][:INSIGHT_NEWS_CONTENT_CHARS],
                         "source": article["source"],
                         "url": article["url"]
                     } 
@@ -183,20 +224,23 @@ async def generate_company_insights(company_id: str, force: bool = False):
         
         # Generate insights using Gemini
         logger.info(f"Generating insights for company: {company['name']}")
-        insights_response = await gemini_service.generate_insights(
+        # Store each insight as soon as it has been generated, while Gemini is still writing
+        # the rest; a failed insert doesn't drop the others
+        store_tasks = []
+        async for insight in gemini_service.stream_insights(
             company["name"],
             {"competitors": competitors_data},
             news_data
-        )
-        
-        # Store insights
-        stored_insights_count = 0
-        for insight in insights_response.get("insights", []):
-            await db.create_insight(
+        ):
+            store_tasks.append(asyncio.create_task(db.create_insight(
                 company_id=company_id,
                 content=f"{insight.get('title', 'Insight')}: {insight.get('description', '')}"
-            )
-            stored_insights_count += 1
+            )))
+        results = await asyncio.gather(*store_tasks, return_exceptions=True)
+        for result in results:
+            if isinstance(result, Exception):
+                logger.error(f"Failed to store an insight for company {company_id}: {result}")
+        stored_insights_count = sum(1 for result in results if not isinstance(result, Exception))
             
         logger.info(f"Generated and stored {stored_insights_count} insights for company: {company['name']}")
             
@@ -1,6 +1,7 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query
 from pydantic import BaseModel
 import logging
+import os
 from typing import List, Optional, Dict
 import asyncio  # Import asyncio
 
@@ -13,6 +14,18 @@ logger = logging.getLogger(__name__)
 # Initialize services
 news_service = NewsService()
 
+# News fetches in flight at once across all requests, so fanning out over many competitors
+# stays under the NewsAPI and Gemini rate limits instead of triggering 429s
+NEWS_MAX_CONCURRENCY = int(os.getenv("NEWS_MAX_CONCURRENCY", "5"))
+_news_fetch_semaphore: Optional[asyncio.Semaphore] = None
+
+def _news_fetch_limit() -> asyncio.Semaphore:
+    # Created on first use so it belongs to the server's running event loop
+    global _news_fetch_semaphore
+    if _news_fetch_semaphore is None:
+        _news_fetch_semaphore = asyncio.Semaphore(NEWS_MAX_CONCURRENCY)
+    return _news_fetch_semaphore
+
 class NewsArticleBase(BaseModel):
     title: str
     source: str
@@ -28,11 +41,13 @@ class CompetitorNewsResponse(BaseModel):
     competitor_id: str
     competitor_name: str
     articles: List[NewsArticleBase]
+    total_articles: int
 
 @router.get("/competitor/{competitor_id}", response_model=CompetitorNewsResponse)
-async def get_competitor_news(competitor_id: str):
+async def get_competitor_news(competitor_id: str, limit: Optional[int] = Query(None, ge=1)):
     """
     Get news articles for a specific competitor.
+    `limit` returns only the first N articles; `total_articles` is always the full count.
     """
     try:
         # Get competitor info
@@ -50,7 +65,7 @@ async def get_competitor_news(competitor_id: str):
         
         # Format the response
         articles = []
-        for article in stored_articles:
+        for article in stored_articles[:limit]:
             articles.append({
                 "title": article["title"],
                 "source": article["source"],
@@ -62,7 +77,8 @@ async def get_competitor_news(competitor_id: str):
         return {
             "competitor_id": competitor_id,
             "competitor_name": competitor["name"],
-            "articles": articles
+            "articles": articles,
+            "total_articles": len(stored_articles)
         }
         
     except HTTPException:
@@ -72,9 +88,10 @@ async def get_competitor_news(competitor_id: str):
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/company/{company_id}", response_model=Dict[str, List[NewsArticleBase]])
-async def get_company_competitors_news(company_id: str):
+async def get_company_competitors_news(company_id: str, limit: Optional[int] = Query(None, ge=1)):
     """
     Get news for all competitors of a company, fetching concurrently if needed.
+    `limit` caps the number of articles returned per competitor.
     """
     try:
         # Get company
@@ -104,7 +121,7 @@ async def get_company_competitors_news(company_id: str):
 
             # Format articles
             articles = []
-            for article in news_articles:
+            for article in news_articles[:limit]:
                 articles.append({
                     "title": article["title"],
                     "source": article["source"],
@@ -147,20 +164,19 @@ async def fetch_and_store_competitor_news(competitor_id: str):
 
         # Fetch news from the NewsAPI and developments from Gemini
         # get_competitor_news now returns a mix, let's rename the variable
-        items = await news_service.get_competitor_news(competitor["name"])
+        async with _news_fetch_limit():
+            items = await news_service.get_competitor_news(competitor["name"])
 
-        # Store items in the database
-        stored_count = 0
+        # Store all items in one batch; an item missing a required field is skipped rather
+        # than failing the whole batch
+        valid_items = []
         for item in items:
-            await db.create_news_article(
-                competitor_id=competitor_id,
-                title=item["title"],
-                source=item["source"],
-                url=item.get("url"),
-                content=item["content"],
-                published_at=item.get("published_at", "")
-            )
-            stored_count += 1
+            if all(key in item for key in ("title", "source", "content")):
+                valid_items.append(item)
+            else:
+                logger.error(f"Skipping news item without title/source/content for competitor {competitor_id}: {item}")
+        stored = await db.create_news_articles(competitor_id, valid_items)
+        stored_count = len(stored)
 
         logger.info(f"Stored {stored_count} news/development items for competitor: {competitor['name']}")
 
@@ -5,7 +5,7 @@ Run test scenarios for the Competitive Intelligence Agent
 import argparse
 import sys
 import logging
-from test_api import test_full_api_workflow, check_feature_status
+from test_api import test_full_api_workflow, check_feature_status, run_with_session, run_async
 
 # Configure logging
 logging.basicConfig(
@@ -45,7 +45,7 @@ def main():
             return 1
         
         print(f"\nChecking status for company ID: {args.id}")
-        check_feature_status(args.id)
+        run_async(run_with_session(check_feature_status, args.id))
         return 0
     
     if args.competitor_check:
@@ -56,11 +56,11 @@ def main():
         
         print(f"\nChecking competitors for company ID: {args.id}")
         from test_api import get_company_competitors
-        get_company_competitors(args.id)
+        run_async(run_with_session(get_company_competitors, args.id))
         return 0
     
     print(f"\nRunning full test workflow for company: {args.company}")
-    test_full_api_workflow(args.company)
+    run_async(run_with_session(test_full_api_workflow, args.company))
     return 0
 
 if __name__ == "__main__":
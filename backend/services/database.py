@@ -1,4 +1,5 @@
 import uuid
+import asyncio
 from datetime import datetime
 import logging
 from typing import Dict, List, Optional, Any
@@ -13,6 +14,10 @@ class InMemoryDB:
         self.competitors = {}
         self.news_articles = {}
         self.insights = {}
+        # company_id -> Event set (and replaced) on the next change to that company's competitors,
+        # plus how many waiters hold it; the entry is dropped once the last one releases it
+        self.competitor_change_events: Dict[str, asyncio.Event] = {}
+        self.competitor_change_waiters: Dict[str, int] = {}
         logger.info("In-memory database initialized")
     
     # Company operations
@@ -70,6 +75,7 @@ class InMemoryDB:
             "created_at": datetime.now()
         }
         self.competitors[competitor_id] = competitor
+        self._notify_competitors_changed(company_id)
         logger.info(f"Created competitor: {name} (ID: {competitor_id})")
         return competitor
     
@@ -78,14 +84,47 @@ class InMemoryDB:
         if competitor:
             competitor["deep_research_markdown"] = markdown
             competitor["deep_research_status"] = status
+            self._notify_competitors_changed(competitor["company_id"])
             logger.info(f"Updated deep research for competitor {competitor_id} with status: {status}")
             return competitor
         logger.error(f"Competitor {competitor_id} not found for research update.")
         return None
     
+    def competitor_change_event(self, company_id: str) -> asyncio.Event:
+        """Event that is set the next time a competitor of this company is created or updated.
+        
+        Every call must be paired with release_competitor_change_event once the caller stops waiting.
+        """
+        event = self.competitor_change_events.get(company_id)
+        if event is None:
+            event = self.competitor_change_events[company_id] = asyncio.Event()
+        self.competitor_change_waiters[company_id] = self.competitor_change_waiters.get(company_id, 0) + 1
+        return event
+    
+    def release_competitor_change_event(self, company_id: str, event: asyncio.Event):
+        # An event that already fired was removed when it was set
+        if self.competitor_change_events.get(company_id) is not event:
+            return
+        waiters = self.competitor_change_waiters.get(company_id, 1) - 1
+        if waiters > 0:
+            self.competitor_change_waiters[company_id] = waiters
+        else:
+            del self.competitor_change_events[company_id]
+            self.competitor_change_waiters.pop(company_id, None)
+    
+    def _notify_competitors_changed(self, company_id: str):
+        event = self.competitor_change_events.pop(company_id, None)
+        self.competitor_change_waiters.pop(company_id, None)
+        if event:
+            event.set()
+    
     async def get_competitor(self, competitor_id: str) -> Optional[Dict[str, Any]]:
         return self.competitors.get(competitor_id)
     
+    async def get_competitors_by_ids(self, competitor_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Look up several competitors in one call; IDs that don't exist are left out."""
+        return {cid: self.competitors[cid] for cid in competitor_ids if cid in self.competitors}
+    
     async def get_competitors_by_company(self, company_id: str) -> List[Dict[str, Any]]:
         result = []
         for competitor in self.competitors.values():
@@ -110,6 +149,25 @@ class InMemoryDB:
         self.news_articles[article_id] = article
         return article
     
+    async def create_news_articles(self, competitor_id: str, articles: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Store a batch of articles (title, source, url, content, published_at) for one competitor in one call."""
+        now = datetime.now()
+        created = []
+        for item in articles:
+            article_id = str(uuid.uuid4())
+            created.append({
+                "id": article_id,
+                "competitor_id": competitor_id,
+                "title": item["title"],
+                "source": item["source"],
+                "url": item.get("url"),
+                "content": item["content"],
+                "published_at": item.get("published_at") or now.isoformat(),
+                "created_at": now
+            })
+        self.news_articles.update((article["id"], article) for article in created)
+        return created
+    
     async def get_news_by_competitor(self, competitor_id: str) -> List[Dict[str, Any]]:
         result = []
         for article in self.news_articles.values():
@@ -1,6 +1,9 @@
 import os
+import io
 import json
 import re
+import hashlib
+import sqlite3
 from google import genai
 from google.genai import types
 import logging
@@ -12,6 +15,52 @@ from .prompts import GeminiPrompts
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Successful company analyses and competitor lists, keyed by the exact request, so repeat
+# lookups of the same company skip the search-grounded Gemini call
+RESPONSE_CACHE_PATH = os.getenv(
+    "GEMINI_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "gemini_cache.sqlite3") # backend/
+)
+RESPONSE_CACHE_TTL = 24 * 60 * 60 # Seconds before a cached response is considered stale
+
+class _InsightStreamParser:
+    """Pulls complete objects out of the "insights" array of a JSON response as it streams in."""
+
+    def __init__(self):
+        self.text = ""
+        self.finished = False # Closing bracket of the array seen
+        self._pos = None # Offset of the next unparsed array element, once the array has started
+        self._decoder = json.JSONDecoder()
+
+    def feed(self, chunk: str) -> list:
+        """Add streamed text and return any insights it completed."""
+        self.text += chunk
+        if self.finished:
+            return []
+        if self._pos is None:
+            match = re.search(r'"insights"\s*:\s*\[', self.text)
+            if not match:
+                return []
+            self._pos = match.end()
+
+        insights = []
+        while True:
+            # Skip the whitespace and commas between elements
+            while self._pos < len(self.text) and self.text[self._pos] in " \t\r\n,":
+                self._pos += 1
+            if self._pos >= len(self.text):
+                break
+            if self.text[self._pos] == "]":
+                self.finished = True
+                break
+            try:
+                insight, self._pos = self._decoder.raw_decode(self.text, self._pos)
+            except json.JSONDecodeError:
+                break # Element not complete yet (or malformed; the caller falls back at the end)
+            if isinstance(insight, dict):
+                insights.append(insight)
+        return insights
+
 class GeminiService:
     def __init__(self):
         try:
@@ -21,6 +70,12 @@ class GeminiService:
             self.model = "gemini-2.0-flash-001"  # Using standard model instead of flash preview
             self.pro_model = "gemini-2.5-pro-preview-03-25"  # For deep research
             self.temperature = 0.81  # Set temperature for all model calls
+            try:
+                with sqlite3.connect(RESPONSE_CACHE_PATH) as conn:
+                    conn.execute("CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL)")
+            except sqlite3.Error as e:
+                # The cache is an optimization; reads and writes already fall back to calling Gemini
+                logger.warning(f"Gemini response cache unavailable at {RESPONSE_CACHE_PATH}: {e}")
             logger.info("Gemini service initialized")
         except Exception as e:
             logger.error(f"Error initializing Gemini service: {e}")
@@ -28,7 +83,7 @@ class GeminiService:
 
     def _extract_json_from_response(self, response_text):
         """Extract JSON from response text, handling markdown code blocks and potential preamble."""
-        logger.debug(f"Raw response text for JSON extraction:\n{response_text}")
+        logger.debug("Raw response text for JSON extraction:\n%s", response_text)
 
         # 1. Try finding JSON within markdown code blocks first
         json_pattern = r"```(?:json)?\s*(\{[\s\S]*?\})\s*```" # More specific pattern for object
@@ -72,9 +127,46 @@ class GeminiService:
              logger.error(f"Attempted to parse: {json_str}")
              raise json.JSONDecodeError(f"Unexpected error during JSON parsing: {e}", json_str or "", 0) # Raise standard error
 
+    def _response_cache_key(self, system_instruction: str, prompt: str) -> str:
+        """Hash of everything that shapes the response, so a prompt or model change never reuses stale results."""
+        request = json.dumps([self.pro_model, system_instruction, prompt])
+        return hashlib.sha256(request.encode("utf-8")).hexdigest()
+
+    async def _read_cached_response(self, key: str) -> Optional[dict]:
+        """Return the cached response for key if it is younger than RESPONSE_CACHE_TTL."""
+        def read():
+            with sqlite3.connect(RESPONSE_CACHE_PATH) as conn:
+                return conn.execute(
+                    "SELECT value FROM responses WHERE key = ? AND created_at > ?",
+                    (key, time.time() - RESPONSE_CACHE_TTL)
+                ).fetchone()
+        try:
+            row = await asyncio.get_running_loop().run_in_executor(None, read)
+        except sqlite3.Error as e:
+            logger.warning(f"Failed to read Gemini response cache: {e}")
+            return None
+        return json.loads(row[0]) if row else None
+
+    async def _write_cached_response(self, key: str, value: dict):
+        def write():
+            with sqlite3.connect(RESPONSE_CACHE_PATH) as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO responses (key, value, created_at) VALUES (?, ?, ?)",
+                    (key, json.dumps(value), time.time())
+                )
+        try:
+            await asyncio.get_running_loop().run_in_executor(None, write)
+        except sqlite3.Error as e:
+            logger.warning(f"Failed to write Gemini response cache: {e}")
+
     async def analyze_company(self, company_name: str, max_retries: int = 1):
         """Analyze what the company does and generate a friendly message."""
         prompt = GeminiPrompts.company_analysis(company_name)
+        cache_key = self._response_cache_key(GeminiPrompts.COMPANY_ANALYSIS_SYSTEM, prompt)
+        cached = await self._read_cached_response(cache_key)
+        if cached is not None:
+            logger.info(f"Using cached company analysis for {company_name}")
+            return cached
         
         attempt = 0
         last_exception = None
@@ -90,20 +182,26 @@ class GeminiService:
                 ]
                 tools = [types.Tool(google_search=types.GoogleSearch())]
                 generate_content_config = types.GenerateContentConfig(
+                    system_instruction=GeminiPrompts.COMPANY_ANALYSIS_SYSTEM,
                     tools=tools,
                     response_mime_type="text/plain",
                     temperature=self.temperature,
                 )
                 
-                # Collect the full response from stream
-                response_text = ""
-                for chunk in self.client.models.generate_content_stream(
-                    model=self.pro_model,
-                    contents=contents,
-                    config=generate_content_config,
-                ):
-                    if hasattr(chunk, 'text'):
-                        response_text += chunk.text
+                # Collect the full response from stream, in an executor so the event loop
+                # (and any Gemini call started alongside this one) isn't blocked meanwhile
+                def collect_stream():
+                    text = ""
+                    for chunk in self.client.models.generate_content_stream(
+                        model=self.pro_model,
+                        contents=contents,
+                        config=generate_content_config,
+                    ):
+                        if hasattr(chunk, 'text'):
+                            text += chunk.text
+                    return text
+
+                response_text = await asyncio.get_running_loop().run_in_executor(None, collect_stream)
                 
                 # Extract JSON from response
                 try:
@@ -113,6 +211,7 @@ class GeminiService:
                         logger.error(f"Invalid result type from Gemini: {type(result)}")
                         raise ValueError("Invalid result type") # Treat as error for retry
                     logger.info(f"Successfully parsed company analysis for {company_name}")
+                    await self._write_cached_response(cache_key, result)
                     return result # Success!
                 except json.JSONDecodeError as e:
                     logger.error(f"JSONDecodeError on attempt {attempt}: {e}")
@@ -155,9 +254,15 @@ class GeminiService:
         logger.info(f"Identifying competitors for {company_name} using non-streaming call.")
         try:
             prompt = GeminiPrompts.identify_competitors(company_name)
+            cache_key = self._response_cache_key(GeminiPrompts.IDENTIFY_COMPETITORS_SYSTEM, prompt)
+            cached = await self._read_cached_response(cache_key)
+            if cached is not None:
+                logger.info(f"Using cached competitors for {company_name}")
+                return cached
             contents = [types.Content(role="user", parts=[types.Part.from_text(text=prompt)])]
             tools = [types.Tool(google_search=types.GoogleSearch())]
             generate_content_config = types.GenerateContentConfig(
+                system_instruction=GeminiPrompts.IDENTIFY_COMPETITORS_SYSTEM,
                 tools=tools,
                 response_mime_type="text/plain", # Expecting JSON, but request plain text
                 temperature=self.temperature,
@@ -168,11 +273,14 @@ class GeminiService:
             for attempt in range(max_attempts):
                 logger.info(f"Attempt {attempt+1}/{max_attempts} to identify competitors for {company_name}")
                 try:
-                    # Use non-streaming call
-                    response = self.client.models.generate_content(
-                        model=self.pro_model,
-                        contents=contents,
-                        config=generate_content_config,
+                    # Use non-streaming call, run in an executor to avoid blocking the event loop
+                    response = await asyncio.get_running_loop().run_in_executor(
+                        None,
+                        lambda: self.client.models.generate_content(
+                            model=self.pro_model,
+                            contents=contents,
+                            config=generate_content_config,
+                        )
                     )
                     response_text = response.text # Get the full text response
 
@@ -180,7 +288,7 @@ class GeminiService:
                         logger.warning(f"Received empty response text on attempt {attempt+1}")
                         raise ValueError("Empty response text")
 
-                    logger.debug(f"Raw response for competitor identification: {response_text[:500]}")
+                    logger.debug("Raw response for competitor identification: %.500s", response_text)
 
                     # Try to parse the JSON using the robust extractor
                     competitors_data = self._extract_json_from_response(response_text)
@@ -191,6 +299,9 @@ class GeminiService:
                         raise ValueError("Response missing 'competitors' list or invalid structure")
 
                     logger.info(f"Successfully identified and parsed competitors for {company_name}")
+                    # An empty list may just be a bad answer, so leave it uncached for the next refresh to retry
+                    if competitors_data["competitors"]:
+                        await self._write_cached_response(cache_key, competitors_data)
                     return competitors_data # Success!
 
                 except (json.JSONDecodeError, ValueError) as e:
@@ -240,57 +351,91 @@ class GeminiService:
         
         return text
 
-    async def generate_insights(self, company_name: str, competitors_data: dict, news_data: dict):
-        """Generate insights based on competitor news."""
-        # Prepare news context for the prompt
-        news_context = ""
+    def _insights_request(self, company_name: str, competitors_data: dict, news_data: dict):
+        """Build the contents and config for an insights generation call."""
+        # Prepare news context for the prompt, writing into one buffer rather than
+        # re-copying the growing string on every += for large news sets
+        news_buf = io.StringIO()
         for competitor_name, articles in news_data.items():
-            news_context += f"\n===== NEWS FOR {competitor_name} =====\n"
+            news_buf.write(f"\n===== NEWS FOR {competitor_name} =====\n")
             for article in articles:
-                news_context += f"HEADLINE: {article['title']}\n"
-                news_context += f"CONTENT: {article['content']}\n\n"
+                news_buf.write(f"HEADLINE: {article['title']}\nCONTENT: {article['content']}\n\n")
+        news_context = news_buf.getvalue()
         
         prompt = GeminiPrompts.generate_insights(company_name, competitors_data, news_context)
-        
-        try:
-            contents = [
-                types.Content(
-                    role="user",
-                    parts=[types.Part.from_text(text=prompt)],
-                )
-            ]
-            generate_content_config = types.GenerateContentConfig(
-                response_mime_type="text/plain",
+        contents = [
+            types.Content(
+                role="user",
+                parts=[types.Part.from_text(text=prompt)],
             )
-            
-            # Collect the full response from stream
-            response_text = ""
-            for chunk in self.client.models.generate_content_stream(
-                model=self.pro_model,
-                contents=contents,
-                config=generate_content_config,
-            ):
-                if hasattr(chunk, 'text'):
-                    response_text += chunk.text
-            
-            # Extract JSON from response
+        ]
+        generate_content_config = types.GenerateContentConfig(
+            system_instruction=GeminiPrompts.GENERATE_INSIGHTS_SYSTEM,
+            response_mime_type="text/plain",
+        )
+        return contents, generate_content_config
+
+    async def stream_insights(self, company_name: str, competitors_data: dict, news_data: dict):
+        """Generate insights based on competitor news, yielding each one as soon as the model has finished writing it."""
+        contents, generate_content_config = self._insights_request(company_name, competitors_data, news_data)
+        loop = asyncio.get_running_loop()
+        chunks: asyncio.Queue = asyncio.Queue()
+        end_of_stream = object()
+
+        # The SDK stream is blocking, so it is read in an executor thread that hands each
+        # chunk's text back to the event loop
+        def read_stream():
             try:
-                result = self._extract_json_from_response(response_text)
-                # Ensure result is a dict with insights key
-                if not isinstance(result, dict):
-                    logger.error(f"Invalid result type from Gemini: {type(result)}")
-                    return {"insights": []}
-                insights = result.get('insights', [])
-                return {"insights": insights}
-            except json.JSONDecodeError:
-                logger.error(f"Failed to parse JSON from insights response: {response_text}")
-                # Return empty insights list as fallback
-                return {"insights": []}
-                
+                for chunk in self.client.models.generate_content_stream(
+                    model=self.pro_model,
+                    contents=contents,
+                    config=generate_content_config,
+                ):
+                    text = getattr(chunk, 'text', None)
+                    if text:
+                        loop.call_soon_threadsafe(chunks.put_nowait, text)
+                loop.call_soon_threadsafe(chunks.put_nowait, end_of_stream)
+            except Exception as e:
+                loop.call_soon_threadsafe(chunks.put_nowait, e)
+
+        try:
+            reader = loop.run_in_executor(None, read_stream)
+            parser = _InsightStreamParser()
+            yielded = 0
+            while True:
+                item = await chunks.get()
+                if item is end_of_stream:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                for insight in parser.feed(item):
+                    yielded += 1
+                    yield insight
+            await reader
         except Exception as e:
             logger.error(f"Error generating insights: {e}")
             raise
 
+        if parser.finished:
+            return
+        # The array never closed cleanly (e.g. the model added comments or trailing commas):
+        # fall back to parsing the whole response, and yield whatever wasn't yielded yet
+        try:
+            result = self._extract_json_from_response(parser.text)
+        except json.JSONDecodeError:
+            logger.error(f"Failed to parse JSON from insights response: {parser.text}")
+            return
+        if not isinstance(result, dict):
+            logger.error(f"Invalid result type from Gemini: {type(result)}")
+            return
+        for insight in result.get('insights', [])[yielded:]:
+            yield insight
+
+    async def generate_insights(self, company_name: str, competitors_data: dict, news_data: dict):
+        """Generate insights based on competitor news."""
+        insights = [insight async for insight in self.stream_insights(company_name, competitors_data, news_data)]
+        return {"insights": insights}
+
     async def deep_research_competitor(self, competitor_name: str, competitor_description: Optional[str], company_name: Optional[str] = None):
         """Generates an in-depth research report for a competitor using a Pro model."""
         logger.info(f"Starting deep research for: {competitor_name} using model {self.pro_model}")
@@ -350,7 +495,7 @@ class GeminiService:
             # --- END PREAMBLE STRIPPING ---
 
             logger.info(f"Deep research final content generated for: {competitor_name} {company_context} (Length: {len(cleaned_response_text)})")
-            logger.debug(f"Deep research content snippet after cleaning: {cleaned_response_text[:1000]}") # Log cleaned snippet
+            logger.debug("Deep research content snippet after cleaning: %.1000s", cleaned_response_text) # Log cleaned snippet
 
             return cleaned_response_text # Return the cleaned markdown
             # --- END VALIDATION ---
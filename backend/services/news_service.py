@@ -65,7 +65,7 @@ class NewsService:
                 json_str = response_text
 
         try:
-            logger.debug(f"Attempting to parse JSON: {json_str[:100]}...") # Debug level
+            logger.debug("Attempting to parse JSON: %.100s...", json_str) # Debug level
             # Added basic check for empty string before parsing
             if not json_str or not json_str.strip():
                 logger.error("Cannot parse empty JSON string.")
@@ -93,6 +93,7 @@ class NewsService:
             tools = [types.Tool(google_search=types.GoogleSearch())]
             # Ensure temperature is set if desired, otherwise defaults apply
             generate_content_config = types.GenerateContentConfig(
+                system_instruction=NewsPrompts.NEWS_WITH_GEMINI_SYSTEM,
                 tools=tools,
                 response_mime_type="text/plain"
                 # temperature=0.7 # Optional: Add temperature if needed
@@ -119,7 +120,7 @@ class NewsService:
                  return []
 
             # Log the raw response before parsing
-            logger.debug(f"Raw response text from Gemini news stream for {competitor_name}: {response_text[:500]}")
+            logger.debug("Raw response text from Gemini news stream for %s: %.500s", competitor_name, response_text)
 
             result = self._extract_json_from_response(response_text)
 
@@ -1,62 +1,92 @@
 import json
+from functools import lru_cache
+from string import Template
+from typing import List, Optional, Tuple
+
+try:
+    import orjson # Optional: faster JSON serialization for prompt payloads
+except ImportError:
+    orjson = None
+
+# Prompt payloads use compact JSON: the model does not need indentation, and
+# whitespace would only add bytes and tokens to every request.
+if orjson is not None:
+    def _dumps_compact(data) -> str:
+        return orjson.dumps(data).decode("utf-8")
+else:
+    # Reuse a single encoder instead of re-creating one per json.dumps call
+    _dumps_compact = json.JSONEncoder(separators=(",", ":"), ensure_ascii=False).encode
+
+# Prompt bodies are compiled once at import. User-supplied values (company and
+# competitor names, news text) are substituted with Template.safe_substitute, so
+# braces or '$' in those values pass through verbatim and literal JSON braces in
+# the examples need no escaping. Values are passed as a single mapping rather
+# than keyword arguments, which saves a kwargs pack/unpack per render.
+#
+# The JSON output schemas are identical for every request, so they live in
+# separate *_SYSTEM constants that callers send as the system instruction.
+# The per-request user prompt then carries only the dynamic task text, and the
+# static schema forms a stable prefix the API can cache across calls.
+# Shared by every JSON-producing system instruction below.
+_JSON_OUTPUT_RULES = """
+        **Output Requirements:**
+        Provide ONLY a single, valid JSON object with the following exact structure, and no introductory text, explanations, or summaries outside it. Adhere strictly to JSON syntax rules (double quotes for keys and string values, no trailing commas).
+"""
 
-class GeminiPrompts:
-    @staticmethod
-    def company_analysis(company_name: str) -> str:
-        return f"""
-        You are an expert Competitive Intelligence Agent. Your primary function is to assist companies like "{company_name}" in understanding their market landscape.
+_COMPANY_ANALYSIS_TMPL = Template("""
+        You are an expert Competitive Intelligence Agent. Your primary function is to assist companies like "$company_name" in understanding their market landscape.
 
-        **Task:** Analyze the company named "{company_name}".
+        **Task:** Analyze the company named "$company_name".
 
         **Methodology:**
-        1.  **Information Gathering:** Search for "{company_name}"'s official website, recent press releases, credible news articles, and professional profiles (like LinkedIn) to understand their core business.
+        1.  **Information Gathering:** Search for "$company_name"'s official website, recent press releases, credible news articles, and professional profiles (like LinkedIn) to understand their core business.
         2.  **Analysis:** Identify their primary products/services, target customer segments, core value proposition, and discernible business model. Determine their main industry and any relevant sub-sectors.
-        3.  **Synthesis:** Craft a response summarizing these findings and generating an appropriate welcome message *from you (Competitive Intelligence Agent)* to the user ({company_name}).
+        3.  **Synthesis:** Craft a response summarizing these findings and generating an appropriate welcome message *from you (Competitive Intelligence Agent)* to the user ($company_name).
 
-        **Output Requirements:**
-        Provide ONLY a single, valid JSON object with the following exact structure. Adhere strictly to JSON syntax rules (double quotes for keys and string values, no trailing commas).
+        **Output Requirements:** Respond using the exact output format defined in the system instructions.
+        """)
 
+_COMPANY_ANALYSIS_SYSTEM = _JSON_OUTPUT_RULES + """
         ```json
-        {{
-            "description": "A concise (2-3 sentences) yet informative summary of {company_name}'s business. Detail its primary offerings, target market, unique value proposition, and business model (if identified).",
-            "industry": "The main industry and specific sub-sector(s) or niche(s) where {company_name} operates.",
-            "welcome_message": "A professional and engaging welcome message (1 sentence) *from Competitive Intelligence Agent* to {company_name}. It should: 1) Acknowledge their core business area. 2) Subtly incorporate a relevant (and ideally witty or insightful, if possible a pun) comment related to their company name, industry, or primary business segment. 3) Express readiness to assist with competitive intelligence." (Make sure the welcome message is concise and to the point)
-        }}
+        {
+            "description": "A concise (2-3 sentences) yet informative summary of the company's business. Detail its primary offerings, target market, unique value proposition, and business model (if identified).",
+            "industry": "The main industry and specific sub-sector(s) or niche(s) where the company operates.",
+            "welcome_message": "A professional and engaging welcome message (1 sentence) *from Competitive Intelligence Agent* to the company. It should: 1) Acknowledge their core business area. 2) Subtly incorporate a relevant (and ideally witty or insightful, if possible a pun) comment related to their company name, industry, or primary business segment. 3) Express readiness to assist with competitive intelligence." (Make sure the welcome message is concise and to the point)
+        }
         ```
 
-        **Example Welcome Message Structure:** "Welcome, {company_name}! Knowing you're making waves in [Industry/Business Area], The Competitive Intelligence Agent is ready to help you navigate the competitive currents. Let's get started!" (Adapt the tone and specific reference).
+        **Example Welcome Message Structure:** "Welcome, [Company Name]! Knowing you're making waves in [Industry/Business Area], The Competitive Intelligence Agent is ready to help you navigate the competitive currents. Let's get started!" (Adapt the tone and specific reference).
 
         **Contingency:** If specific information is scarce, provide the best possible analysis based on available data, clearly stating any assumptions made within the description. Ensure the output is always valid JSON, even if some fields contain default text like "Information not readily available".
-        """
+"""
 
-    @staticmethod
-    def identify_competitors(company_name: str) -> str:
-        return f"""
+_IDENTIFY_COMPETITORS_TMPL = Template("""
         You are 'Competitive Intelligence Agent', a highly skilled Competitive Intelligence Agent specializing in market mapping and competitor identification.
 
-        **Task:** Identify and profile key competitors for "{company_name}".
+        **Task:** Identify and profile key competitors for "$company_name".
 
         **Methodology:**
-        1.  **Contextual Understanding:** First, ensure you have a clear grasp of "{company_name}"'s core business, primary products/services, target market, and unique value proposition (you may need to infer this if not explicitly provided).
+        1.  **Contextual Understanding:** First, ensure you have a clear grasp of "$company_name"'s core business, primary products/services, target market, and unique value proposition (you may need to infer this if not explicitly provided).
         2.  **Competitor Identification:** Systematically identify competitors, considering different categories:
             *   **Direct Competitors:** Companies offering very similar products/services to the same target market.
             *   **Indirect Competitors:** Companies offering different solutions that address the same core customer need or pain point.
-            *   **Potential/Emerging Competitors:** Newer players, companies in adjacent markets, or those with stated intentions to enter "{company_name}"'s space.
+            *   **Potential/Emerging Competitors:** Newer players, companies in adjacent markets, or those with stated intentions to enter "$company_name"'s space.
         3.  **Competitor Profiling:** For each identified competitor, gather information on their:
             *   Core business focus and market positioning.
             *   Key product/service offerings and differentiators.
             *   Primary target customer segments.
             *   Known strengths (e.g., market share, technology, brand recognition, funding).
             *   Known weaknesses (e.g., market limitations, technical gaps, negative sentiment).
-        4.  **Prioritization:** Focus on the competitors most relevant to "{company_name}" based on market overlap, competitive intensity, and strategic significance. Aim for a list of the most impactful competitors (typically 5-10, but adjust based on the market).
+        4.  **Prioritization:** Focus on the competitors most relevant to "$company_name" based on market overlap, competitive intensity, and strategic significance. Aim for a list of the most impactful competitors (typically 5-10, but adjust based on the market).
 
-        **Output Requirements:**
-        Format your response as **VALID JSON ONLY**. No introductory text, explanations, or summaries outside the JSON structure. The JSON object MUST strictly adhere to the following format:
+        **Output Requirements:** Respond using the exact output format defined in the system instructions.
+        """)
 
+_IDENTIFY_COMPETITORS_SYSTEM = _JSON_OUTPUT_RULES + """
         ```json
-        {{
+        {
             "competitors": [
-                {{
+                {
                     "name": "Official Competitor Name",
                     "description": "A brief (1-2 sentences) description covering core business, target market, and key differentiator(s).",
                     "strengths": [
@@ -70,216 +100,316 @@ class GeminiPrompts:
                         "Key Weakness 2 (e.g., Reliant on older technology stack)"
                         // Aim for 2-3 distinct weaknesses
                     ]
-                }}
+                }
                 // ... more competitor objects, if identified ...
             ]
-        }}
+        }
         ```
 
-        **Important:** Ensure valid JSON syntax (double quotes, commas, brackets). If no competitors are found, return `{{ "competitors": [] }}`. Clearly state assumptions within descriptions if precise data is unavailable for a competitor.
-        """
-
-    @staticmethod
-    def generate_insights(company_name: str, competitors_data: dict, news_context: str) -> str:
-        # Prepare competitor data for embedding in the prompt, ensuring it's readable.
-        competitors_summary = json.dumps(competitors_data, indent=2)
-        if len(competitors_summary) > 3000: # Avoid overly long prompts
-             competitors_summary = f"Summary of {len(competitors_data.get('competitors', []))} competitors provided (data truncated for brevity)."
+        **Important:** If no competitors are found, return `{ "competitors": [] }`. Clearly state assumptions within descriptions if precise data is unavailable for a competitor.
+"""
 
-        return f"""
+# Instructions come first and the per-run news last, so repeat runs for a company share a long
+# prompt prefix that Gemini can serve from its implicit cache
+_GENERATE_INSIGHTS_TMPL = Template("""
         You are 'Competitive Intelligence Agent', a strategic analyst expert in synthesizing competitive intelligence data into actionable insights.
 
-        **Task:** Generate strategic insights for "{company_name}" based on the provided competitor information and recent news context.
-
-        **Provided Data:**
-        1.  **User Company:** {company_name}
-        2.  **Competitor Profiles:**
-            ```json
-            {competitors_summary}
-            ```
-        3.  **Recent News Context:**
-            ```
-            {news_context if news_context else "No specific recent news provided."}
-            ```
+        **Task:** Generate strategic insights for "$company_name" based on the provided competitor information and recent news context.
 
         **Analysis Framework:**
-        Evaluate the data through these lenses, always relating back to "{company_name}":
+        Evaluate the data through these lenses, always relating back to "$company_name":
         *   **Market Dynamics:** Identify key trends, shifts in the competitive landscape, technological advancements, or changing customer behaviors evident from the data.
-        *   **Competitive Positioning:** Assess "{company_name}"'s relative strengths and weaknesses compared to the listed competitors. Identify potential vulnerabilities or unique advantages.
+        *   **Competitive Positioning:** Assess "$company_name"'s relative strengths and weaknesses compared to the listed competitors. Identify potential vulnerabilities or unique advantages.
         *   **Strategic Implications:** Translate observations into potential opportunities (e.g., untapped market segments, competitor weaknesses to exploit) and threats (e.g., competitor moves, market saturation, disruptive technologies).
 
         **Instructions:**
         *   Generate 3 to 7 distinct, high-impact insights.
         *   Each insight must be:
-            *   **Actionable:** Suggesting a potential direction or area of focus for "{company_name}".
+            *   **Actionable:** Suggesting a potential direction or area of focus for "$company_name".
             *   **Specific:** Clearly stating the observation and its relevance.
             *   **Data-Driven:** Referencing specific information from the competitor profiles or news context where possible.
-            *   **Relevant:** Directly applicable to "{company_name}"'s strategic situation.
+            *   **Relevant:** Directly applicable to "$company_name"'s strategic situation.
             *   **Forward-Looking:** Considering potential future developments.
         *   For each insight, define its `type` as "opportunity", "threat", or "trend".
         *   List `related_competitors` whose data directly informed the insight.
         *   If news context is limited, focus insights primarily on competitor analysis and general market dynamics.
 
-        **Output Requirements:**
-        Output **ONLY** a single, valid JSON object. Ensure perfect JSON syntax.
+        **Output Requirements:** Respond using the exact output format defined in the system instructions.
 
+        **Provided Data:**
+        1.  **User Company:** $company_name
+        2.  **Competitor Profiles:**
+            ```json
+            $competitors_summary
+            ```
+        3.  **Recent News Context:**
+            ```
+            $news_context
+            ```
+        """)
+
+_GENERATE_INSIGHTS_SYSTEM = _JSON_OUTPUT_RULES + """
         ```json
-        {{
+        {
             "insights": [
-                {{
+                {
                     "title": "Concise, impactful title summarizing the insight.",
-                    "description": "Detailed explanation of the insight. Explain its significance for {company_name}, reference supporting data points (e.g., 'Competitor X's weakness in Y', 'Recent news item Z'), and suggest potential strategic considerations or actions.",
+                    "description": "Detailed explanation of the insight. Explain its significance for the user company, reference supporting data points (e.g., 'Competitor X's weakness in Y', 'Recent news item Z'), and suggest potential strategic considerations or actions.",
                     "type": "opportunity | threat | trend",
                     "related_competitors": ["Competitor Name 1", "Competitor Name 2"] // List names exactly as provided in competitors_data
-                }}
+                }
                 // ... more insight objects (5-10 total) ...
             ]
-        }}
+        }
         ```
-        """
+"""
 
-    @staticmethod
-    def deep_research_competitor(competitor_name: str, competitor_description: str, company_name: str = None) -> str:
-        # Determine the context string and adjust section numbering based on whether company_name is provided
-        if company_name:
-            company_context_intro = f"- Analysis Context: This report is being generated for **{company_name}**, focusing on aspects most relevant to their competitive positioning against **{competitor_name}**."
-            implications_section = f"""
-        2.  **Strategic Implications for {company_name}:**
-            *   **Competitive Threat Level:** Assess the directness and intensity of competition (e.g., market overlap, product similarity, target audience clash). [Source(s)]
-            *   **Key Differentiators (vs. {company_name}):** Highlight major differences in business model, technology, GTM strategy, or value proposition. [Source(s)]
-            *   **Potential Areas of Vulnerability for {competitor_name} (Exploitable by {company_name}):** Identify weaknesses {company_name} could potentially leverage. [Source(s)]
-            *   **Opportunities for {company_name}:** Suggest potential strategic responses, market gaps to target, or partnership possibilities inspired by {competitor_name}'s profile. [Source(s)]"""
-            overview_section_num = 3
-        else:
-            company_context_intro = ""
-            implications_section = ""
-            overview_section_num = 2
-
-        return f"""
-        You are 'Competitive Intelligence Agent', a senior competitive intelligence analyst executing a deep-dive research assignment.
-
-        **Task:** Create an exhaustive, data-driven, and strategically relevant competitive analysis report for **{competitor_name}**.
+_NEWS_WITH_GEMINI_TMPL = Template("""
+        You are 'Competitive Intelligence Agent', a Competitive Intelligence Agent specializing in timely news monitoring and impact analysis.
 
-        **Initial Context:**
-        - Competitor Under Review: {competitor_name}
-        - Known Description: "{competitor_description or 'No initial description provided.'}"
-        {company_context_intro}
-        - Do not include a date for the report
+        **Task:** Find and summarize significant recent news articles and official announcements about "$competitor_name" published within the last **$days_back days**.
 
         **Research Methodology:**
-        1.  **Comprehensive Search:** Utilize search tools to gather extensive information from diverse, credible sources:
-            *   Official Company Sources: Website, press releases, investor relations pages, annual/quarterly reports, blogs.
-            *   Third-Party Sources: Reputable news outlets, industry analysis reports (e.g., Gartner, Forrester, market-specific analysts), financial data providers (e.g., Crunchbase, PitchBook summaries if available), business databases.
-            *   Other Signals: LinkedIn profiles (especially leadership), job postings (for strategic hints), patent filings, customer reviews (on G2, Capterra, etc.), social media presence.
-        2.  **Information Verification & Attribution:**
-            *   Cross-reference key claims across multiple sources. Prioritize primary sources (company statements) and reputable secondary sources (major news, analysts).
-            *   **CRITICAL REQUIREMENT:** Every significant data point, claim, or assessment **MUST** be attributed to its source(s). Use inline Markdown links: `[Source Description](URL)`.
-            *   If a specific URL isn't available or practical (e.g., synthesized from multiple reports), note parenthetically: `(Source: Company Annual Report 2023)` or `(Source: Synthesized from multiple news articles)`.
-            *   Aim for at least 10-15 *distinct* credible sources throughout the report. Use only verifiable URLs.
+        1.  **Targeted Search:** Query reputable sources for news concerning "$competitor_name". Prioritize:
+            *   Official Company Press Releases (from their website or newswires like PR Newswire, Business Wire).
+            *   Major Business & Technology News Outlets (e.g., Bloomberg, Reuters, WSJ, TechCrunch, VentureBeat).
+            *   Key Industry-Specific Publications relevant to "$competitor_name"'s sector.
+            *   Financial News Sources (if relevant, e.g., for funding, M&A, earnings).
+        2.  **Filtering Criteria:** Select items that indicate potentially significant developments related to:
+            *   **Strategy:** Pivots, new market entries, major partnerships, M&A activity.
+            *   **Products:** Major launches, updates, or discontinuations.
+            *   **Financials:** Funding rounds, earnings reports (if public), significant investments.
+            *   **Leadership:** Key executive hires or departures.
+            *   **Market Perception:** Significant positive or negative coverage, major award wins, regulatory news.
+        3.  **Summarization & Analysis:** For each selected item, briefly explain *what* happened and *why it matters* (its potential significance or implication).
 
-        **Report Structure:**
-        Organize the report using the following sections with Markdown headings. Ensure logical flow and comprehensive coverage within each section.
+        **Output Requirements:** Respond using the exact output format defined in the system instructions.
+        """)
 
-        1.  **Executive Summary:**
-            *   A concise (2-3 paragraph) overview summarizing {competitor_name}'s current market position, core strategy, key strengths/weaknesses, recent momentum, and overall competitive threat level (especially if {company_name} context is provided).
+_NEWS_WITH_GEMINI_SYSTEM = _JSON_OUTPUT_RULES + """
+        ```json
+        {
+            "articles": [
+                {
+                    "title": "Clear, concise headline summarizing the news item.",
+                    "source": "Name of the publication or source (e.g., 'TechCrunch', '<Competitor> Press Release', 'Bloomberg').",
+                    "url": "Direct URL to the article/announcement. If unavailable, use null or omit.",
+                    "publishedAt": "Publication date in ISO 8601 format (YYYY-MM-DD or YYYY-MM-DDTHH:MM:SSZ). Use the date provided by the source.",
+                    "content": "A brief summary (2-4 sentences) explaining the core news and highlighting its potential strategic significance or market impact for the competitor."
+                }
+                // ... more article objects (up to 5-7 most significant) ...
+            ]
+        }
+        ```
 
-        {implications_section}
+        **Important Considerations:**
+        *   Prioritize the **most impactful and strategically relevant** news items from the specified period. Aim for quality over quantity (target 5-7 items, but fewer is acceptable if less news exists).
+        *   If no significant news is found within the timeframe, return an empty array: `{"articles": []}`.
+        *   Ensure date accuracy and the specified ISO 8601 format.
+        *   Verify URLs are direct links to the source material.
+"""
 
-        {overview_section_num}.  **Company Overview:**
+# Numbered report sections that follow the Executive Summary (and the Strategic
+# Implications section, when the report has a company context).
+_DEEP_REPORT_SECTIONS = (
+    """**Company Overview:**
             *   **Mission, Vision, Stated Values:** Official statements and how they appear to manifest in strategy/culture. [Source(s)]
             *   **Core Business Model:** How they create, deliver, and capture value (e.g., SaaS subscription, transactional, ad-based). Key revenue streams. [Source(s)]
             *   **History & Key Milestones:** Founding, major funding rounds, acquisitions, significant pivots, leadership changes. [Source(s)]
             *   **Scale & Structure:** Estimated size (employees, revenue if public/reported), geographic footprint, organizational structure insights. [Source(s)]
-            *   **Culture & Reputation:** Insights from employee reviews (e.g., Glassdoor snippets), awards, public perception, ESG initiatives if prominent. [Source(s)]
-
-        {overview_section_num + 1}.  **Products, Services & Technology:**
+            *   **Culture & Reputation:** Insights from employee reviews (e.g., Glassdoor snippets), awards, public perception, ESG initiatives if prominent. [Source(s)]""",
+    """**Products, Services & Technology:**
             *   **Portfolio Analysis:** Detailed description of major product lines/service offerings. Target use cases and customer segments for each. [Source(s)]
             *   **Technology Stack (if discernible):** Key technologies used (e.g., cloud provider, core languages/frameworks from job postings, partnerships). [Source(s)]
             *   **Innovation & R&D:** Mentioned areas of research, recent patents, new feature velocity, strategic technology partnerships. [Source(s)]
-            *   **Pricing & Packaging:** Overview of pricing strategy (e.g., tiered, usage-based), publicly available pricing details or tiers. [Source(s)]
-
-        {overview_section_num + 2}.  **Market Position & Go-to-Market Strategy:**
+            *   **Pricing & Packaging:** Overview of pricing strategy (e.g., tiered, usage-based), publicly available pricing details or tiers. [Source(s)]""",
+    """**Market Position & Go-to-Market Strategy:**
             *   **Target Market:** Specific industries, company sizes, and personas they target. [Source(s)]
             *   **Market Share & Positioning:** Estimated or claimed market share (if available), perceived position (e.g., leader, challenger, niche). Analyst report mentions. [Source(s)]
             *   **Marketing & Sales Strategy:** Key marketing channels (content, SEO, paid, events), sales approach (direct, channel), key messaging themes. [Source(s)]
-            *   **Strategic Partnerships:** Alliances (tech, reseller, integration) that extend their reach or capabilities. [Source(s)]
-
-        {overview_section_num + 3}.  **Financials & Funding (If Available):**
+            *   **Strategic Partnerships:** Alliances (tech, reseller, integration) that extend their reach or capabilities. [Source(s)]""",
+    """**Financials & Funding (If Available):**
             *   **Revenue & Growth:** Reported revenue figures, growth rates, profitability status (if public or credibly reported). [Source(s)]
             *   **Funding History:** Total funding raised, latest round details (amount, date, investors, valuation if known). [Source(s)]
-            *   **M&A Activity:** Notable acquisitions made or rumors of being an acquisition target. Strategic rationale. [Source(s)]
-
-        {overview_section_num + 4}.  **SWOT Analysis (Synthesized):**
+            *   **M&A Activity:** Notable acquisitions made or rumors of being an acquisition target. Strategic rationale. [Source(s)]""",
+    """**SWOT Analysis (Synthesized):**
             *   **Strengths:** Internal capabilities and market advantages (e.g., technology, brand, talent, IP). [Derived from previous sections, cite sources implicitly]
             *   **Weaknesses:** Internal limitations and market disadvantages (e.g., technical debt, narrow market focus, leadership gaps). [Derived, cite implicitly]
             *   **Opportunities:** External factors they could leverage (e.g., market growth, new tech, competitor missteps). [Derived, cite implicitly]
-            *   **Threats:** External risks they face (e.g., new competitors, regulatory changes, economic downturn). [Derived, cite implicitly]
-
-        {overview_section_num + 5}.  **Recent Developments & News (Last 6-12 months):**
+            *   **Threats:** External risks they face (e.g., new competitors, regulatory changes, economic downturn). [Derived, cite implicitly]""",
+    """**Recent Developments & News (Last 6-12 months):**
             *   Summarize key recent events: Major product launches, strategic announcements, significant partnerships, executive changes, funding news, relevant market commentary. [Source(s)]
-            *   Analyze the *implications* of these developments.
-
-        {overview_section_num + 6}.  **Leadership & Organization:**
+            *   Analyze the *implications* of these developments.""",
+    """**Leadership & Organization:**
             *   **Key Executives:** Brief profiles of CEO and other critical C-suite members (background, tenure, known strategic priorities). [Source(s): LinkedIn, Company Website]
-            *   **Board of Directors (if relevant/public):** Notable members and their affiliations. [Source(s)]
-
-        {overview_section_num + 7}.  **Future Outlook & Strategic Direction:**
+            *   **Board of Directors (if relevant/public):** Notable members and their affiliations. [Source(s)]""",
+    """**Future Outlook & Strategic Direction:**
             *   **Stated Goals & Roadmap:** Any publicly stated plans for growth, expansion (product, geo), or future focus areas. [Source(s)]
             *   **Potential Strategic Moves:** Analyst speculation or logical inferences about future directions based on current strategy and market trends.
-            *   **Key Risks & Challenges:** Summarize the most significant hurdles they face moving forward.
+            *   **Key Risks & Challenges:** Summarize the most significant hurdles they face moving forward.""",
+)
+
+
+_DEEP_PREFIX = """
+        You are 'Competitive Intelligence Agent', a senior competitive intelligence analyst executing a deep-dive research assignment.
+
+        **Task:** Create an exhaustive, data-driven, and strategically relevant competitive analysis report for **$competitor_name**.
+
+        **Initial Context:**
+        - Competitor Under Review: $competitor_name
+        - Known Description: "$competitor_description"
+"""
+
+_DEEP_CONTEXT_LINE = """        - Analysis Context: This report is being generated for **$company_name**, focusing on aspects most relevant to their competitive positioning against **$competitor_name**.
+"""
+
+_DEEP_METHODOLOGY = """        - Do not include a date for the report
+
+        **Research Methodology:**
+        1.  **Comprehensive Search:** Utilize search tools to gather extensive information from diverse, credible sources:
+            *   Official Company Sources: Website, press releases, investor relations pages, annual/quarterly reports, blogs.
+            *   Third-Party Sources: Reputable news outlets, industry analysis reports (e.g., Gartner, Forrester, market-specific analysts), financial data providers (e.g., Crunchbase, PitchBook summaries if available), business databases.
+            *   Other Signals: LinkedIn profiles (especially leadership), job postings (for strategic hints), patent filings, customer reviews (on G2, Capterra, etc.), social media presence.
+        2.  **Information Verification & Attribution:**
+            *   Cross-reference key claims across multiple sources. Prioritize primary sources (company statements) and reputable secondary sources (major news, analysts).
+            *   **CRITICAL REQUIREMENT:** Every significant data point, claim, or assessment **MUST** be attributed to its source(s). Use inline Markdown links: `[Source Description](URL)`.
+            *   If a specific URL isn't available or practical (e.g., synthesized from multiple reports), note parenthetically: `(Source: Company Annual Report 2023)` or `(Source: Synthesized from multiple news articles)`.
+            *   Aim for at least 10-15 *distinct* credible sources throughout the report. Use only verifiable URLs.
+
+        **Report Structure:**
+        Organize the report using the following sections with Markdown headings. Ensure logical flow and comprehensive coverage within each section.
+
+        1.  **Executive Summary:**
+            *   A concise (2-3 paragraph) overview summarizing $competitor_name's current market position, core strategy, key strengths/weaknesses, recent momentum, and overall competitive threat level"""
+
+_DEEP_IMPLICATIONS = """
+        2.  **Strategic Implications for $company_name:**
+            *   **Competitive Threat Level:** Assess the directness and intensity of competition (e.g., market overlap, product similarity, target audience clash). [Source(s)]
+            *   **Key Differentiators (vs. $company_name):** Highlight major differences in business model, technology, GTM strategy, or value proposition. [Source(s)]
+            *   **Potential Areas of Vulnerability for $competitor_name (Exploitable by $company_name):** Identify weaknesses $company_name could potentially leverage. [Source(s)]
+            *   **Opportunities for $company_name:** Suggest potential strategic responses, market gaps to target, or partnership possibilities inspired by $competitor_name's profile. [Source(s)]"""
+
+_DEEP_GUIDELINES = """
 
         **Final Output Guidelines:**
         *   Maintain a professional, objective, and analytical tone.
         *   Use clear, concise language. Avoid jargon where possible or explain it.
         *   **Strictly adhere to the sourcing requirements.** Lack of sources for claims will diminish the report's value.
         *   Focus on intelligence that informs strategic decision-making.
-        {f"*   Continuously frame findings through the lens of competition with {company_name}." if company_name else ""}
-        *   Output should be well-formatted Markdown.
+"""
+
+_DEEP_FRAMING_LINE = """        *   Continuously frame findings through the lens of competition with $company_name.
+"""
+
+_DEEP_SUFFIX = """        *   Output should be well-formatted Markdown.
         """
 
-class NewsPrompts:
+
+def _numbered_report_sections(first_section_num: int) -> str:
+    return "\n\n".join(
+        f"        {section_num}.  {section}"
+        for section_num, section in enumerate(_DEEP_REPORT_SECTIONS, start=first_section_num)
+    )
+
+
+# Only the company-context pieces differ between the two variants; the large
+# shared prefix, methodology, guidelines and suffix are the same string objects.
+_DEEP_MIDDLE_WITH_CTX = "".join((
+    " (especially if $company_name context is provided).\n\n",
+    _DEEP_IMPLICATIONS,
+    "\n\n",
+    _numbered_report_sections(first_section_num=3),
+))
+_DEEP_MIDDLE_NO_CTX = ".\n\n" + _numbered_report_sections(first_section_num=2)
+
+_DEEP_WITH_CONTEXT = Template("".join((
+    _DEEP_PREFIX, _DEEP_CONTEXT_LINE, _DEEP_METHODOLOGY, _DEEP_MIDDLE_WITH_CTX,
+    _DEEP_GUIDELINES, _DEEP_FRAMING_LINE, _DEEP_SUFFIX,
+)))
+_DEEP_NO_CONTEXT = Template("".join((
+    _DEEP_PREFIX, _DEEP_METHODOLOGY, _DEEP_MIDDLE_NO_CTX, _DEEP_GUIDELINES, _DEEP_SUFFIX,
+)))
+
+
+@lru_cache(maxsize=128)
+def _deep_research_skeleton(company_name: Optional[str]) -> str:
+    """Renders the deep-research prompt for a company, leaving $competitor_name and
+    $competitor_description as placeholders. Cached, since it only depends on company_name.
+    The result is itself a Template source: a "$" in the company name is escaped as "$$"."""
+    if company_name:
+        return _DEEP_WITH_CONTEXT.safe_substitute({"company_name": company_name.replace("$", "$$")})
+    return _DEEP_NO_CONTEXT.template
+
+
+def _instantiate_deep_research(skeleton: str, competitor_name: str, competitor_description: Optional[str]) -> str:
+    """Fills the per-competitor fields into a skeleton from _deep_research_skeleton.
+
+    Both fields are substituted in one pass, so a value that itself contains "$competitor_..."
+    is inserted literally rather than expanded again.
+    """
+    return Template(skeleton).safe_substitute({
+        "competitor_name": competitor_name,
+        "competitor_description": competitor_description or 'No initial description provided.',
+    })
+
+
+class GeminiPrompts:
+    COMPANY_ANALYSIS_SYSTEM = _COMPANY_ANALYSIS_SYSTEM
+    IDENTIFY_COMPETITORS_SYSTEM = _IDENTIFY_COMPETITORS_SYSTEM
+    GENERATE_INSIGHTS_SYSTEM = _GENERATE_INSIGHTS_SYSTEM
+
     @staticmethod
-    def get_news_with_gemini(competitor_name: str, days_back: int) -> str:
-        return f"""
-        You are 'Competitive Intelligence Agent', a Competitive Intelligence Agent specializing in timely news monitoring and impact analysis.
+    @lru_cache(maxsize=512)
+    def company_analysis(company_name: str) -> str:
+        return _COMPANY_ANALYSIS_TMPL.safe_substitute({"company_name": company_name})
 
-        **Task:** Find and summarize significant recent news articles and official announcements about "{competitor_name}" published within the last **{days_back} days**.
+    @staticmethod
+    @lru_cache(maxsize=512)
+    def identify_competitors(company_name: str) -> str:
+        return _IDENTIFY_COMPETITORS_TMPL.safe_substitute({"company_name": company_name})
 
-        **Research Methodology:**
-        1.  **Targeted Search:** Query reputable sources for news concerning "{competitor_name}". Prioritize:
-            *   Official Company Press Releases (from their website or newswires like PR Newswire, Business Wire).
-            *   Major Business & Technology News Outlets (e.g., Bloomberg, Reuters, WSJ, TechCrunch, VentureBeat).
-            *   Key Industry-Specific Publications relevant to "{competitor_name}"'s sector.
-            *   Financial News Sources (if relevant, e.g., for funding, M&A, earnings).
-        2.  **Filtering Criteria:** Select items that indicate potentially significant developments related to:
-            *   **Strategy:** Pivots, new market entries, major partnerships, M&A activity.
-            *   **Products:** Major launches, updates, or discontinuations.
-            *   **Financials:** Funding rounds, earnings reports (if public), significant investments.
-            *   **Leadership:** Key executive hires or departures.
-            *   **Market Perception:** Significant positive or negative coverage, major award wins, regulatory news.
-        3.  **Summarization & Analysis:** For each selected item, briefly explain *what* happened and *why it matters* (its potential significance or implication).
+    @staticmethod
+    def generate_insights(company_name: str, competitors_data: dict, news_context: str) -> str:
+        # Prepare competitor data for embedding in the prompt as compact JSON.
+        competitors_summary = _dumps_compact(competitors_data)
+        if len(competitors_summary) > 3000: # Avoid overly long prompts
+             competitors_summary = f"Summary of {len(competitors_data.get('competitors', []))} competitors provided (data truncated for brevity)."
 
-        **Output Requirements:**
-        Return **ONLY** a single, valid JSON object. Strictly adhere to JSON syntax. The structure must be exactly:
+        return _GENERATE_INSIGHTS_TMPL.safe_substitute({
+            "company_name": company_name,
+            "competitors_summary": competitors_summary,
+            "news_context": news_context if news_context else "No specific recent news provided.",
+        })
 
-        ```json
-        {{
-            "articles": [
-                {{
-                    "title": "Clear, concise headline summarizing the news item.",
-                    "source": "Name of the publication or source (e.g., 'TechCrunch', '{competitor_name} Press Release', 'Bloomberg').",
-                    "url": "Direct URL to the article/announcement. If unavailable, use null or omit.",
-                    "publishedAt": "Publication date in ISO 8601 format (YYYY-MM-DD or YYYY-MM-DDTHH:MM:SSZ). Use the date provided by the source.",
-                    "content": "A brief summary (2-4 sentences) explaining the core news and highlighting its potential strategic significance or market impact for {competitor_name}."
-                }}
-                // ... more article objects (up to 5-7 most significant) ...
-            ]
-        }}
-        ```
+    @staticmethod
+    @lru_cache(maxsize=512)
+    def deep_research_competitor(competitor_name: str, competitor_description: str, company_name: str = None) -> str:
+        return _instantiate_deep_research(_deep_research_skeleton(company_name), competitor_name, competitor_description)
 
-        **Important Considerations:**
-        *   Prioritize the **most impactful and strategically relevant** news items from the specified period. Aim for quality over quantity (target 5-7 items, but fewer is acceptable if less news exists).
-        *   If no significant news is found within the timeframe, return an empty array: `{{"articles": []}}`.
-        *   Ensure date accuracy and the specified ISO 8601 format.
-        *   Verify URLs are direct links to the source material.
-        """
\ No newline at end of file
+    @staticmethod
+    def deep_research_competitors_batch(company_name: Optional[str], competitors: List[Tuple[str, Optional[str]]]) -> List[str]:
+        """Builds deep-research prompts for several (name, description) competitors of one company,
+        rendering the shared skeleton only once."""
+        skeleton = _deep_research_skeleton(company_name)
+        return [_instantiate_deep_research(skeleton, name, description) for name, description in competitors]
+
+    @staticmethod
+    def cache_clear() -> None:
+        """Drops all memoized prompts, e.g. between tests."""
+        GeminiPrompts.company_analysis.cache_clear()
+        GeminiPrompts.identify_competitors.cache_clear()
+        GeminiPrompts.deep_research_competitor.cache_clear()
+        _deep_research_skeleton.cache_clear()
+
+class NewsPrompts:
+    NEWS_WITH_GEMINI_SYSTEM = _NEWS_WITH_GEMINI_SYSTEM
+
+    @staticmethod
+    @lru_cache(maxsize=512)
+    def get_news_with_gemini(competitor_name: str, days_back: int) -> str:
+        return _NEWS_WITH_GEMINI_TMPL.safe_substitute({"competitor_name": competitor_name, "days_back": days_back})
+
+    @staticmethod
+    def cache_clear() -> None:
+        """Drops all memoized prompts, e.g. between tests."""
+        NewsPrompts.get_news_with_gemini.cache_clear()
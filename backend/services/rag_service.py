@@ -1,18 +1,32 @@
 # backend/services/rag_service.py
 
 import os
+import json
+import math
 import logging
+import hashlib
+import uuid
+import sqlite3
+import shutil
+import numpy as np
 import faiss # Make sure faiss-cpu or faiss-gpu is installed
 from langchain_google_genai import GoogleGenerativeAIEmbeddings, ChatGoogleGenerativeAI # Use Gemini Chat
 from langchain_community.vectorstores import FAISS
+from langchain_community.docstore.base import Docstore, AddableMixin
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_community.vectorstores.utils import DistanceStrategy
 from langchain_core.documents import Document
-from langchain_text_splitters import RecursiveCharacterTextSplitter
+from langchain_text_splitters import RecursiveCharacterTextSplitter, MarkdownHeaderTextSplitter
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.runnables import RunnablePassthrough, RunnableParallel
 from langchain_core.output_parsers import StrOutputParser
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, AsyncIterator
 from dotenv import load_dotenv
 import asyncio
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 
 # Corrected import path relative to where backend/main.py is run
 from services.database import db
@@ -26,60 +40,456 @@ logger = logging.getLogger(__name__)
 
 # Configuration
 FAISS_INDEX_PATH = "./faiss_indexes" # Directory to save indexes relative to where main.py is run
+FAISS_INDEX_FILE = "index.faiss" # Same file name LangChain's save_local uses
+EMBEDDING_CACHE_PATH = os.path.join(FAISS_INDEX_PATH, "embedding_cache.sqlite3") # Content-hash -> vector cache shared by all companies
 EMBEDDING_MODEL_NAME = "models/embedding-001" # Google's embedding model
 LLM_MODEL_NAME = "gemini-2.0-flash-001"
 CHUNK_SIZE = 1000
 CHUNK_OVERLAP = 200
+MIN_CHUNK_CHARS = 100 # Deep-research fragments shorter than this carry too little context to index
+# Paragraph -> line -> sentence -> word -> character. The trailing "" guarantees every piece can be cut to size.
+SPLITTER_SEPARATORS = ["\n\n", "\n", ". ", " ", ""]
+DEEP_RESEARCH_HEADERS = [("#", "h1"), ("##", "h2"), ("###", "h3")]
+EMBED_BATCH_SIZE = 100 # Texts per embedding request (Google's batch limit)
+EMBED_MAX_CONCURRENCY = 8 # Embedding requests in flight at once per index build
+HNSW_M = 32 # Graph neighbours per node
+HNSW_EF_CONSTRUCTION = 200 # Build-time search depth (higher = better graph, slower build)
+HNSW_EF_SEARCH = 64 # Query-time search depth (higher = better recall, slower query)
+IVF_PQ_MIN_VECTORS = 5000 # Above this many chunks, switch from HNSW to a compressed IVF+PQ index
+IVF_PQ_SUBQUANTIZERS = (48, 32, 24, 16, 8) # Preferred PQ sub-vector counts; the first that divides the dimension is used
+IVF_NPROBE = 16 # Inverted lists scanned per query
+VECTOR_STORE_CACHE_SIZE = 16 # Loaded per-company indexes kept in memory (LRU)
+IO_POOL_WORKERS = 2 # Threads for index save/load and embedding-cache reads/writes
+CPU_POOL_WORKERS = max(1, (os.cpu_count() or 2) // 2) # Threads for FAISS index builds
+FAISS_OMP_THREADS = os.getenv("FAISS_OMP_THREADS") # OpenMP threads per FAISS operation; unset keeps FAISS's default
+
+# RAG prompt template
+RAG_PROMPT_TEMPLATE = """You are an AI assistant analyzing competitive intelligence data. Answer the following question based *only* on the provided context. If the context does not contain the answer, state that clearly. Do not make up information.
+
+        Context:
+        {context}
+
+        Question: {question}
+
+        Answer:"""
+
+def configure_faiss_threads() -> None:
+    """Applies FAISS_OMP_THREADS to FAISS's process-wide OpenMP setting. Called once at app startup."""
+    if FAISS_OMP_THREADS:
+        faiss.omp_set_num_threads(max(1, int(FAISS_OMP_THREADS)))
+        logger.info(f"FAISS OpenMP threads set to {faiss.omp_get_max_threads()}")
+
+def _format_docs(docs: List[Document]) -> str:
+    """Formats retrieved documents for the RAG prompt."""
+    return "\n\n".join(
+        f"Source: {doc.metadata.get('source', 'N/A')}\nContent: {doc.page_content}"
+        for doc in docs
+    )
 
 # Installation Note for FAISS:
 # Using pip: `pip install faiss-cpu` (or `faiss-gpu` if you have CUDA setup).
 # May require C++ build tools.
 # Using conda: `conda install -c pytorch faiss-cpu` is often easier.
 
+class PackedDocstore(Docstore, AddableMixin):
+    """Docstore saved as one UTF-8 text blob, an offsets array and JSON metadata instead of a pickle.
+
+    On load the text blob is memory-mapped and only retrieved documents are decoded. Documents added
+    after loading are kept in memory until the store is saved again.
+    """
+    TEXT_FILE = "docs_text.bin"
+    OFFSETS_FILE = "docs_offsets.npy"
+    META_FILE = "docs_meta.json"
+
+    def __init__(self, ids: List[str], text, offsets: np.ndarray, metadatas: List[dict]):
+        self.ids = ids # Row order matches the FAISS index positions they were saved from
+        self._rows = {doc_id: row for row, doc_id in enumerate(ids)}
+        self._text = text
+        self._offsets = offsets
+        self._metadatas = metadatas
+        self._added: Dict[str, Document] = {}
+
+    def search(self, search: str):
+        if search in self._added:
+            return self._added[search]
+        row = self._rows.get(search)
+        if row is None:
+            return f"ID {search} not found."
+        start, end = self._offsets[row], self._offsets[row + 1]
+        return Document(
+            id=search,
+            page_content=bytes(self._text[start:end]).decode("utf-8"),
+            metadata=dict(self._metadatas[row])
+        )
+
+    def content_hashes(self) -> Optional[set]:
+        """Content hashes of every document, read from the metadata without decoding any text.
+
+        Returns None if any document predates content hashing.
+        """
+        hashes = set()
+        metadatas = self._metadatas + [doc.metadata for doc in self._added.values()]
+        for metadata in metadatas:
+            content_hash = metadata.get("content_hash")
+            if content_hash is None:
+                return None
+            hashes.add(content_hash)
+        return hashes
+
+    def add(self, texts: Dict[str, Document]) -> None:
+        overlapping = set(texts).intersection(self._rows).union(set(texts).intersection(self._added))
+        if overlapping:
+            raise ValueError(f"Tried to add ids that already exist: {overlapping}")
+        self._added.update(texts)
+
+    @classmethod
+    def save(cls, folder_path: str, ids: List[str], docs: List[Document]) -> None:
+        """Writes docs (in index order) to folder_path, which should be a fresh directory.
+
+        Stores are swapped into place a whole directory at a time (see RAGService._write_vector_store),
+        so stores that still memory-map the previous text blob keep reading the old, unlinked file.
+        """
+        encoded = [doc.page_content.encode("utf-8") for doc in docs]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(chunk) for chunk in encoded], dtype=np.int64)
+
+        with open(os.path.join(folder_path, cls.TEXT_FILE), "wb") as f:
+            f.write(b"".join(encoded))
+        with open(os.path.join(folder_path, cls.OFFSETS_FILE), "wb") as f:
+            np.save(f, offsets)
+        meta = {"ids": ids, "metadatas": [doc.metadata for doc in docs]}
+        with open(os.path.join(folder_path, cls.META_FILE), "wb") as f:
+            f.write(json.dumps(meta, ensure_ascii=False).encode("utf-8"))
+
+    @classmethod
+    def load(cls, folder_path: str) -> "PackedDocstore":
+        with open(os.path.join(folder_path, cls.META_FILE), encoding="utf-8") as f:
+            meta = json.load(f)
+        offsets = np.load(os.path.join(folder_path, cls.OFFSETS_FILE))
+        text_path = os.path.join(folder_path, cls.TEXT_FILE)
+        # np.memmap cannot map an empty file
+        text = np.memmap(text_path, dtype=np.uint8, mode="r") if os.path.getsize(text_path) else b""
+        return cls(meta["ids"], text, offsets, meta["metadatas"])
+
+    @classmethod
+    def exists(cls, folder_path: str) -> bool:
+        return os.path.exists(os.path.join(folder_path, cls.META_FILE))
+
+
 class RAGService:
     def __init__(self):
-        """Initializes the RAG Service with Embeddings, LLM, and Text Splitter."""
+        """Initializes the RAG Service and Text Splitters. Embeddings and LLM clients are created on first use."""
         try:
             google_api_key = os.getenv("GOOGLE_API_KEY")
             if not google_api_key:
                 raise ValueError("GOOGLE_API_KEY not found in environment variables.")
 
-            self.embeddings = GoogleGenerativeAIEmbeddings(
-                model=EMBEDDING_MODEL_NAME,
-                google_api_key=google_api_key
-            )
-            self.llm = ChatGoogleGenerativeAI(
-                model=LLM_MODEL_NAME,
-                google_api_key=google_api_key,
-                temperature=0.3, # Adjust temperature as needed
-                convert_system_message_to_human=True # Often helpful for Gemini
-            )
+            self._google_api_key = google_api_key
+            self._embeddings: Optional[GoogleGenerativeAIEmbeddings] = None
+            self._llm: Optional[ChatGoogleGenerativeAI] = None
+            self._rag_prompt = ChatPromptTemplate.from_template(RAG_PROMPT_TEMPLATE)
+            # Dedicated pools so index I/O and builds don't contend with the app's default executor
+            self._io_pool = ThreadPoolExecutor(max_workers=IO_POOL_WORKERS, thread_name_prefix="faiss-io")
+            self._cpu_pool = ThreadPoolExecutor(max_workers=CPU_POOL_WORKERS, thread_name_prefix="faiss-cpu")
+            # company_id -> loaded FAISS store, most recently used last
+            self._store_cache: "OrderedDict[str, FAISS]" = OrderedDict()
+            # company_id -> [lock, number of holders/waiters]; serializes a company's loads and saves
+            self._store_locks: Dict[str, list] = {}
             self.text_splitter = RecursiveCharacterTextSplitter(
                 chunk_size=CHUNK_SIZE,
                 chunk_overlap=CHUNK_OVERLAP,
+                separators=SPLITTER_SEPARATORS,
+                is_separator_regex=False,
                 length_function=len,
             )
+            self.markdown_splitter = MarkdownHeaderTextSplitter(
+                headers_to_split_on=DEEP_RESEARCH_HEADERS,
+                strip_headers=False # Keep headings in the chunk text for retrieval context
+            )
             if not os.path.exists(FAISS_INDEX_PATH):
                 os.makedirs(FAISS_INDEX_PATH)
                 logger.info(f"Created FAISS index directory: {FAISS_INDEX_PATH}")
+            with sqlite3.connect(EMBEDDING_CACHE_PATH) as conn:
+                conn.execute("CREATE TABLE IF NOT EXISTS embeddings (key BLOB PRIMARY KEY, vector BLOB NOT NULL)")
             logger.info(f"RAG Service initialized with Embedding: {EMBEDDING_MODEL_NAME} and LLM: {LLM_MODEL_NAME}")
 
         except Exception as e:
             logger.error(f"Failed to initialize RAG Service: {e}", exc_info=True)
             raise
 
+    @property
+    def embeddings(self) -> GoogleGenerativeAIEmbeddings:
+        """Embedding client, created on first use."""
+        if self._embeddings is None:
+            self._embeddings = GoogleGenerativeAIEmbeddings(
+                model=EMBEDDING_MODEL_NAME,
+                google_api_key=self._google_api_key
+            )
+        return self._embeddings
+
+    @property
+    def llm(self) -> ChatGoogleGenerativeAI:
+        """Chat model used to answer questions, created on first use."""
+        if self._llm is None:
+            self._llm = ChatGoogleGenerativeAI(
+                model=LLM_MODEL_NAME,
+                google_api_key=self._google_api_key,
+                temperature=0.3, # Adjust temperature as needed
+                convert_system_message_to_human=True # Often helpful for Gemini
+            )
+        return self._llm
+
     def _get_index_path(self, company_id: str) -> str:
         """Generates the file path for a company's FAISS index."""
         # Ensure the path uses OS-independent separators
         return os.path.join(FAISS_INDEX_PATH, f"idx_{company_id}")
 
+    @staticmethod
+    def _embedding_cache_key(text: str) -> bytes:
+        """Content hash of a chunk, scoped to the embedding model so a model change never reuses stale vectors."""
+        return hashlib.blake2b(f"{EMBEDDING_MODEL_NAME}\0{text}".encode("utf-8"), digest_size=16).digest()
+
+    @staticmethod
+    def _read_cached_embeddings(keys: List[bytes]) -> Dict[bytes, np.ndarray]:
+        """Returns cached vectors for whichever keys are present in the embedding cache."""
+        found = {}
+        with sqlite3.connect(EMBEDDING_CACHE_PATH) as conn:
+            # Stay well below SQLite's bound-parameter limit
+            for i in range(0, len(keys), 500):
+                batch = keys[i:i + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = conn.execute(f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch)
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32)
+        return found
+
+    @staticmethod
+    def _write_cached_embeddings(items: List[tuple]) -> None:
+        """Stores (key, vector) pairs in the embedding cache in a single transaction."""
+        with sqlite3.connect(EMBEDDING_CACHE_PATH) as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                [(key, np.asarray(vector, dtype=np.float32).tobytes()) for key, vector in items]
+            )
+
+    async def _embed_texts(self, texts: List[str]) -> np.ndarray:
+        """Embeds texts into an (N, dim) float32 array, reusing cached vectors and sending only cache misses to the embedding API."""
+        loop = asyncio.get_running_loop()
+        keys = [self._embedding_cache_key(text) for text in texts]
+        try:
+            cached = await loop.run_in_executor(self._io_pool, self._read_cached_embeddings, keys)
+        except sqlite3.Error as e:
+            logger.warning(f"Embedding cache read failed, embedding all chunks: {e}")
+            cached = {}
+
+        # Identical chunks (reposted news, boilerplate) share a key, so each distinct text is embedded once
+        miss_indices = []
+        pending_keys = set()
+        for i, key in enumerate(keys):
+            if key not in cached and key not in pending_keys:
+                pending_keys.add(key)
+                miss_indices.append(i)
+        logger.info(f"Embedding cache: {len(texts) - len(miss_indices)} hits or duplicates, {len(miss_indices)} unique misses.")
+        miss_vectors = await self._embed_uncached([texts[i] for i in miss_indices]) if miss_indices else []
+
+        # Fill one preallocated contiguous buffer that FAISS can consume directly
+        dim = len(miss_vectors[0]) if miss_vectors else len(next(iter(cached.values())))
+        vectors = np.empty((len(texts), dim), dtype=np.float32)
+        for i, vector in zip(miss_indices, miss_vectors):
+            vectors[i] = vector
+            cached[keys[i]] = vectors[i]
+        embedded_rows = set(miss_indices)
+        for i, key in enumerate(keys):
+            if i not in embedded_rows:
+                vectors[i] = cached[key]
+
+        if miss_indices:
+            try:
+                new_items = [(keys[i], vectors[i]) for i in miss_indices]
+                await loop.run_in_executor(self._io_pool, self._write_cached_embeddings, new_items)
+            except sqlite3.Error as e:
+                logger.warning(f"Embedding cache write failed: {e}")
+
+        return vectors
+
+    async def _embed_uncached(self, texts: List[str]) -> List[List[float]]:
+        """Embeds texts in fixed-size batches, sending up to EMBED_MAX_CONCURRENCY batches concurrently."""
+        semaphore = asyncio.Semaphore(EMBED_MAX_CONCURRENCY)
+
+        async def embed_batch(batch: List[str]) -> List[List[float]]:
+            async with semaphore:
+                return await self.embeddings.aembed_documents(batch)
+
+        batches = [texts[i:i + EMBED_BATCH_SIZE] for i in range(0, len(texts), EMBED_BATCH_SIZE)]
+        logger.info(f"Embedding {len(texts)} chunks in {len(batches)} batches (max {EMBED_MAX_CONCURRENCY} concurrent).")
+        batch_results = await asyncio.gather(*(embed_batch(batch) for batch in batches))
+        return [vector for batch_vectors in batch_results for vector in batch_vectors]
+
+    def _build_vector_store(self, texts: List[str], vectors: np.ndarray, metadatas: List[dict]) -> FAISS:
+        """Builds a FAISS store from precomputed embeddings (CPU-bound, run in an executor).
+
+        Uses HNSW over fp16-quantized vectors, or a trained IVF+PQ index once there are more than IVF_PQ_MIN_VECTORS chunks.
+        Vectors (and queries) are L2-normalized so inner product ranks by cosine similarity.
+        The (N, dim) float32 array is normalized in place and added to the index without copying.
+        """
+        faiss.normalize_L2(vectors)
+        dim = vectors.shape[1]
+        if len(vectors) > IVF_PQ_MIN_VECTORS:
+            index = self._build_ivf_pq_index(vectors, dim)
+        else:
+            # fp16 storage halves memory and bytes scanned per query; fp16 needs no training
+            index = faiss.IndexHNSWSQ(dim, faiss.ScalarQuantizer.QT_fp16, HNSW_M, faiss.METRIC_INNER_PRODUCT)
+            index.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+            index.hnsw.efSearch = HNSW_EF_SEARCH
+        vector_store = FAISS(
+            embedding_function=self.embeddings,
+            index=index,
+            docstore=InMemoryDocstore({}),
+            index_to_docstore_id={},
+            normalize_L2=True, # Normalizes search queries in place
+            distance_strategy=DistanceStrategy.MAX_INNER_PRODUCT
+        )
+        self._add_to_vector_store(vector_store, texts, vectors, metadatas)
+        return vector_store
+
+    @staticmethod
+    def _add_to_vector_store(vector_store: FAISS, texts: List[str], vectors: np.ndarray, metadatas: List[dict]) -> None:
+        """Appends already-normalized embeddings to a store's index and docstore (CPU-bound, run in an executor)."""
+        start = vector_store.index.ntotal
+        vector_store.index.add(vectors)
+        # Populate the docstore directly instead of round-tripping vectors through add_embeddings
+        ids = [str(uuid.uuid4()) for _ in texts]
+        vector_store.docstore.add({
+            doc_id: Document(id=doc_id, page_content=text, metadata=metadata)
+            for doc_id, text, metadata in zip(ids, texts, metadatas)
+        })
+        vector_store.index_to_docstore_id.update({start + i: doc_id for i, doc_id in enumerate(ids)})
+
+    @staticmethod
+    def _indexed_content_hashes(vector_store: FAISS) -> Optional[set]:
+        """Content hashes of every chunk in a store, or None if it predates content hashing."""
+        if isinstance(vector_store.docstore, PackedDocstore):
+            return vector_store.docstore.content_hashes()
+        hashes = set()
+        for doc_id in vector_store.index_to_docstore_id.values():
+            doc = vector_store.docstore.search(doc_id)
+            content_hash = doc.metadata.get("content_hash") if isinstance(doc, Document) else None
+            if content_hash is None:
+                return None
+            hashes.add(content_hash)
+        return hashes
+
+    @staticmethod
+    def _build_ivf_pq_index(vectors: np.ndarray, dim: int):
+        """Creates and trains an IVF+PQ inner-product index on already-normalized vectors."""
+        nlist = int(4 * math.sqrt(len(vectors)))
+        pq_m = next((m for m in IVF_PQ_SUBQUANTIZERS if dim % m == 0), 1)
+        logger.info(f"Building IVF{nlist},PQ{pq_m}x8 index for {len(vectors)} chunks.")
+        index = faiss.index_factory(dim, f"IVF{nlist},PQ{pq_m}x8", faiss.METRIC_INNER_PRODUCT)
+        index.train(vectors)
+        index.nprobe = IVF_NPROBE
+        index.use_precomputed_table = 0 # Skip the precomputed distance tables to save RAM
+        return index
+
+    def _load_vector_store(self, index_path: str) -> FAISS:
+        """Loads a saved FAISS store from disk and restores query-time HNSW settings."""
+        if PackedDocstore.exists(index_path):
+            docstore = PackedDocstore.load(index_path)
+            vector_store = FAISS(
+                embedding_function=self.embeddings,
+                index=faiss.read_index(os.path.join(index_path, FAISS_INDEX_FILE)),
+                docstore=docstore,
+                index_to_docstore_id=dict(enumerate(docstore.ids))
+            )
+        else:
+            # Indexes saved before the packed docstore still use LangChain's pickle format
+            vector_store = FAISS.load_local(index_path, self.embeddings, allow_dangerous_deserialization=True)
+        if vector_store.index.metric_type == faiss.METRIC_INNER_PRODUCT:
+            # Search settings are not saved with the index; restore them so queries are normalized too.
+            # Older L2 indexes keep the default settings until they are rebuilt.
+            vector_store._normalize_L2 = True
+            vector_store.distance_strategy = DistanceStrategy.MAX_INNER_PRODUCT
+        if hasattr(vector_store.index, "hnsw"):
+            # Apply the current query-time setting even to indexes saved with a different one
+            vector_store.index.hnsw.efSearch = HNSW_EF_SEARCH
+        elif hasattr(vector_store.index, "nprobe"):
+            vector_store.index.nprobe = IVF_NPROBE
+        return vector_store
+
+    @asynccontextmanager
+    async def _store_lock(self, company_id: str) -> AsyncIterator[None]:
+        """Holds the company's store lock; the lock is forgotten once nobody is holding or waiting on it."""
+        entry = self._store_locks.get(company_id)
+        if entry is None:
+            entry = self._store_locks[company_id] = [asyncio.Lock(), 0]
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                yield
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0 and self._store_locks.get(company_id) is entry:
+                del self._store_locks[company_id]
+
+    async def _get_vector_store(self, company_id: str, index_path: str) -> FAISS:
+        """Returns the company's FAISS store from the in-memory LRU cache, loading it from disk on a miss."""
+        vector_store = self._store_cache.get(company_id)
+        if vector_store is not None:
+            self._store_cache.move_to_end(company_id)
+            return vector_store
+
+        async with self._store_lock(company_id):
+            # Another request may have loaded it while we were waiting
+            vector_store = self._store_cache.get(company_id)
+            if vector_store is None:
+                logger.debug(f"Loading FAISS index from: {index_path}")
+                loop = asyncio.get_running_loop()
+                vector_store = await loop.run_in_executor(self._io_pool, self._load_vector_store, index_path)
+                self._store_cache[company_id] = vector_store
+                if len(self._store_cache) > VECTOR_STORE_CACHE_SIZE:
+                    self._store_cache.popitem(last=False)
+            else:
+                self._store_cache.move_to_end(company_id)
+        return vector_store
+
+    def _split_deep_research(self, content: str, metadata: Dict[str, Any]) -> List[Document]:
+        """Splits a deep research report along its markdown headings.
+
+        Sections longer than CHUNK_SIZE are re-split by the character splitter, adjacent small
+        sections are merged back up to CHUNK_SIZE, and leftovers under MIN_CHUNK_CHARS are dropped.
+        """
+        pieces: List[Document] = []
+        for section in self.markdown_splitter.split_text(content):
+            section_metadata = {**metadata, **section.metadata}
+            if len(section.page_content) > CHUNK_SIZE:
+                pieces.extend(
+                    Document(page_content=text, metadata=section_metadata)
+                    for text in self.text_splitter.split_text(section.page_content)
+                )
+            else:
+                pieces.append(Document(page_content=section.page_content, metadata=section_metadata))
+
+        # Greedily merge adjacent pieces; a merged chunk keeps the headings of its first section
+        merged: List[Document] = []
+        for piece in pieces:
+            if merged and len(merged[-1].page_content) + 2 + len(piece.page_content) <= CHUNK_SIZE:
+                merged[-1].page_content += "\n\n" + piece.page_content
+            else:
+                merged.append(piece)
+
+        return [doc for doc in merged if len(doc.page_content) >= MIN_CHUNK_CHARS]
+
     async def _gather_documents_for_company(self, company_id: str) -> List[Document]:
         """Gathers all relevant text data for a company from the database."""
         documents = []
         logger.info(f"Gathering documents for company_id: {company_id}")
 
-        # 1. Fetch Company Data
-        company = await db.get_company(company_id)
+        # 1. Fetch Company Data, Competitors and Insights concurrently
+        company, competitors, insights = await asyncio.gather(
+            db.get_company(company_id),
+            db.get_competitors_by_company(company_id),
+            db.get_insights_by_company(company_id)
+        )
         if not company:
             logger.warning(f"Company data not found for RAG indexing: {company_id}")
             return [] # Return empty list if company itself not found
@@ -90,8 +500,7 @@ class RAGService:
             metadata={"source": "company_info", "company_name": company_name}
         ))
 
-        # 2. Fetch Competitors
-        competitors = await db.get_competitors_by_company(company_id)
+        # 2. Add Competitors
         logger.info(f"Found {len(competitors)} competitors for {company_name}")
         for comp in competitors:
             comp_name = comp.get("name", "Unknown Competitor")
@@ -111,24 +520,21 @@ class RAGService:
                 logger.info(f"Adding completed deep research for {comp_name} to RAG documents.")
                 # Add the competitor name header explicitly to the research content for context
                 research_content = f"Deep Research Report for {comp_name}:\n\n{comp['deep_research_markdown']}"
-                # Split potentially large markdown content
-                research_chunks = self.text_splitter.split_text(research_content)
-                for i, chunk in enumerate(research_chunks):
-                    documents.append(Document(
-                        page_content=chunk,
-                        metadata={"source": "deep_research", "competitor_name": comp_name, "chunk": i, "company_name": company_name}
-                    ))
+                # Split on markdown structure here; update_rag_index leaves these chunks as they are
+                documents.extend(self._split_deep_research(
+                    research_content,
+                    {"source": "deep_research", "competitor_name": comp_name, "company_name": company_name}
+                ))
             elif comp.get('deep_research_status') and comp.get('deep_research_status') != 'not_started':
                  logger.info(f"Skipping deep research for {comp_name} (Status: {comp.get('deep_research_status')})")
 
 
-        # 4. Fetch News (All competitors)
+        # 4. Fetch News (All competitors, queried concurrently)
         logger.info(f"Fetching news for {len(competitors)} competitors...")
+        news_lists = await asyncio.gather(*(db.get_news_by_competitor(comp['id']) for comp in competitors))
         news_count = 0
-        for comp in competitors:
-            comp_id = comp['id']
+        for comp, news_items in zip(competitors, news_lists):
             comp_name = comp.get("name", "Unknown Competitor")
-            news_items = await db.get_news_by_competitor(comp_id)
             for item in news_items:
                 news_text = (
                     f"News/Development concerning {comp_name}:\n"
@@ -144,8 +550,7 @@ class RAGService:
                 news_count += 1
         logger.info(f"Added {news_count} news items.")
 
-        # 5. Fetch Insights
-        insights = await db.get_insights_by_company(company_id)
+        # 5. Add Insights
         logger.info(f"Adding {len(insights)} insights.")
         for insight in insights:
             insight_text = f"Generated Strategic Insight:\n{insight.get('content', 'N/A')}"
@@ -158,7 +563,11 @@ class RAGService:
         return documents
 
     async def update_rag_index(self, company_id: str):
-        """Fetches all data for a company, chunks it, and updates/creates its FAISS RAG index."""
+        """Fetches all data for a company, chunks it, and updates/creates its FAISS RAG index.
+
+        If an index already exists and none of its chunks have gone stale, only new chunks are embedded
+        and appended; otherwise the index is rebuilt from scratch.
+        """
         try:
             # 1. Gather all documents
             documents = await self._gather_documents_for_company(company_id)
@@ -167,32 +576,71 @@ class RAGService:
                 logger.warning(f"No documents found to index for company_id: {company_id}. Skipping index creation.")
                 return
 
-            # 2. Split documents into chunks
-            split_docs = self.text_splitter.split_documents(documents)
+            # 2. Split documents into chunks (deep research arrives already split along its headings)
+            research_docs = [doc for doc in documents if doc.metadata.get("source") == "deep_research"]
+            other_docs = [doc for doc in documents if doc.metadata.get("source") != "deep_research"]
+            split_docs = self.text_splitter.split_documents(other_docs) + research_docs
             logger.info(f"Split documents into {len(split_docs)} chunks for RAG indexing (Company ID: {company_id}).")
 
             if not split_docs:
                  logger.error(f"Text splitting resulted in zero chunks for company_id: {company_id}. Cannot create index.")
                  return
 
-            # 3. Create and save FAISS index
+            for doc in split_docs:
+                # Content hash lets later updates tell which chunks are already indexed
+                doc.metadata["content_hash"] = self._embedding_cache_key(doc.page_content).hex()
+
             index_path = self._get_index_path(company_id)
-            logger.info(f"Creating FAISS index at: {index_path}")
-            # Running CPU-bound embedding and FAISS creation in executor to avoid blocking event loop
             loop = asyncio.get_running_loop()
+
+            # 3. Incremental path: append only chunks the existing index doesn't have yet
+            if os.path.exists(index_path):
+                async with self._store_lock(company_id):
+                    vector_store = await loop.run_in_executor(self._io_pool, self._load_vector_store, index_path)
+                indexed_hashes = self._indexed_content_hashes(vector_store)
+                current_hashes = {doc.metadata["content_hash"] for doc in split_docs}
+                if indexed_hashes is not None and indexed_hashes <= current_hashes:
+                    new_docs = [doc for doc in split_docs if doc.metadata["content_hash"] not in indexed_hashes]
+                    outgrows_hnsw = (
+                        vector_store.index.ntotal + len(new_docs) > IVF_PQ_MIN_VECTORS
+                        and not hasattr(vector_store.index, "nprobe")
+                    )
+                    if not new_docs:
+                        logger.info(f"RAG index for {company_id} is already up to date.")
+                        return
+                    if not outgrows_hnsw:
+                        logger.info(f"Appending {len(new_docs)} new chunks to existing RAG index at: {index_path}")
+                        texts = [doc.page_content for doc in new_docs]
+                        vectors = await self._embed_texts(texts)
+                        faiss.normalize_L2(vectors)
+                        await loop.run_in_executor(
+                             self._cpu_pool,
+                             self._add_to_vector_store,
+                             vector_store,
+                             texts,
+                             vectors,
+                             [doc.metadata for doc in new_docs]
+                        )
+                        await self._save_vector_store(company_id, vector_store, index_path)
+                        return
+                logger.info(f"Existing RAG index for {company_id} has stale chunks or needs a different index type; rebuilding.")
+
+            # 4. Embed chunks (batched, concurrent network calls)
+            texts = [doc.page_content for doc in split_docs]
+            metadatas = [doc.metadata for doc in split_docs]
+            vectors = await self._embed_texts(texts)
+
+            # 5. Create and save FAISS index
+            logger.info(f"Creating FAISS index at: {index_path}")
+            # Running CPU-bound FAISS creation in executor to avoid blocking event loop
             vector_store = await loop.run_in_executor(
-                 None, # Use default thread pool executor
-                 FAISS.from_documents,
-                 split_docs,
-                 self.embeddings
-            )
-            # Saving is I/O bound but can be slow, also run in executor
-            await loop.run_in_executor(
-                 None,
-                 vector_store.save_local,
-                 index_path
+                 self._cpu_pool,
+                 self._build_vector_store,
+                 texts,
+                 vectors,
+                 metadatas
             )
-            logger.info(f"RAG index saved successfully to {index_path}")
+            await self._save_vector_store(company_id, vector_store, index_path)
 
         except Exception as e:
              # Log the exception with traceback
@@ -200,8 +648,48 @@ class RAGService:
              # Optionally, re-raise if you want the caller to handle it
              # raise
 
-    async def ask_question(self, query: str, company_id: str) -> str:
-        """Answers a question using the RAG index for the specified company."""
+    @staticmethod
+    def _write_vector_store(vector_store: FAISS, index_path: str) -> None:
+        """Writes the FAISS index plus a PackedDocstore (no pickle) to a fresh directory and swaps it in at index_path."""
+        parent, name = os.path.split(os.path.normpath(index_path))
+        os.makedirs(parent, exist_ok=True)
+        # Build the whole store beside the live one so readers never see a half-written index
+        tmp_path = os.path.join(parent, f".{name}.tmp-{uuid.uuid4().hex}")
+        os.makedirs(tmp_path)
+        try:
+            faiss.write_index(vector_store.index, os.path.join(tmp_path, FAISS_INDEX_FILE))
+            ids = [vector_store.index_to_docstore_id[row] for row in range(vector_store.index.ntotal)]
+            PackedDocstore.save(tmp_path, ids, [vector_store.docstore.search(doc_id) for doc_id in ids])
+        except BaseException:
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            raise
+        # A directory can't be renamed over a non-empty one, so move the old store aside first.
+        # Stores already loaded from it keep their open (now unlinked) memory maps.
+        old_path = None
+        if os.path.exists(index_path):
+            old_path = os.path.join(parent, f".{name}.old-{uuid.uuid4().hex}")
+            os.rename(index_path, old_path)
+        os.rename(tmp_path, index_path)
+        if old_path is not None:
+            shutil.rmtree(old_path, ignore_errors=True)
+
+    async def _save_vector_store(self, company_id: str, vector_store: FAISS, index_path: str) -> None:
+        """Writes a store to disk and invalidates the in-memory copy of the company's previous index."""
+        # Saving is I/O bound but can be slow, so run it in the I/O pool
+        loop = asyncio.get_running_loop()
+        async with self._store_lock(company_id):
+            await loop.run_in_executor(
+                 self._io_pool,
+                 self._write_vector_store,
+                 vector_store,
+                 index_path
+            )
+            # Drop any cached copy of the previous index so the next question reloads it
+            self._store_cache.pop(company_id, None)
+        logger.info(f"RAG index saved successfully to {index_path}")
+
+    async def _ensure_index(self, company_id: str) -> Optional[str]:
+        """Builds the company's RAG index if it is missing. Returns a user-facing message if it cannot be made available."""
         index_path = self._get_index_path(company_id)
 
         # Check if index exists, attempt to build if not
@@ -216,43 +704,33 @@ class RAGService:
             except Exception as build_e:
                 logger.error(f"Exception occurred while trying to build missing RAG index for {company_id}: {build_e}", exc_info=True)
                 return "I encountered an error while trying to prepare the information needed to answer your question. Please try again later."
-
-        try:
-            # Load the index asynchronously (FAISS loading can involve I/O)
-            logger.debug(f"Loading FAISS index from: {index_path}")
-            loop = asyncio.get_running_loop()
-            vector_store = await loop.run_in_executor(
-                None,
-                lambda: FAISS.load_local(index_path, self.embeddings, allow_dangerous_deserialization=True)
+        return None
+
+    async def _get_rag_chain(self, company_id: str):
+        """Loads the company's index and builds the LCEL retrieval chain over it."""
+        # Load the index (cached in memory after the first question for this company)
+        vector_store = await self._get_vector_store(company_id, self._get_index_path(company_id))
+        retriever = vector_store.as_retriever(search_kwargs={"k": 5}) # Retrieve top 5 relevant chunks
+        logger.debug(f"Retriever created for company {company_id}")
+
+        # Define the RAG chain using LCEL (prompt and formatter are built once, not per question)
+        return (
+            RunnableParallel(
+                {"context": retriever | _format_docs, "question": RunnablePassthrough()}
             )
-            retriever = vector_store.as_retriever(search_kwargs={"k": 5}) # Retrieve top 5 relevant chunks
-            logger.debug(f"Retriever created for company {company_id}")
-
-            # Define RAG prompt template
-            template = """You are an AI assistant analyzing competitive intelligence data. Answer the following question based *only* on the provided context. If the context does not contain the answer, state that clearly. Do not make up information.
-
-            Context:
-            {context}
-
-            Question: {question}
+            | self._rag_prompt
+            | self.llm
+            | StrOutputParser()
+        )
 
-            Answer:"""
-            prompt = ChatPromptTemplate.from_template(template)
-
-            # Define how to format retrieved documents
-            def format_docs(docs: List[Document]) -> str:
-                return "\n\n".join(f"Source: {doc.metadata.get('source', 'N/A')}\nContent: {doc.page_content}" for doc in docs)
-
-            # Define the RAG chain using LCEL
-            rag_chain = (
-                RunnableParallel(
-                    {"context": retriever | format_docs, "question": RunnablePassthrough()}
-                )
-                | prompt
-                | self.llm
-                | StrOutputParser()
-            )
+    async def ask_question(self, query: str, company_id: str) -> str:
+        """Answers a question using the RAG index for the specified company."""
+        unavailable_message = await self._ensure_index(company_id)
+        if unavailable_message:
+            return unavailable_message
 
+        try:
+            rag_chain = await self._get_rag_chain(company_id)
             logger.info(f"Invoking RAG chain for company {company_id} with query: '{query[:50]}...'")
             answer = await rag_chain.ainvoke(query)
             logger.info(f"RAG chain invocation complete for company {company_id}.")
@@ -262,17 +740,40 @@ class RAGService:
             logger.error(f"Error during RAG question answering for {company_id}: {e}", exc_info=True)
             return "Sorry, I encountered an internal error while trying to answer your question based on the available documents."
 
-# Instantiate the service (can be imported and used)
-try:
-    rag_service = RAGService()
-except Exception as e:
-    # If RAG service fails to initialize (e.g., missing API key),
-    # create a dummy service to prevent crashes elsewhere.
-    logger.error("RAG Service failed to initialize. Using a dummy service.", exc_info=True)
-    class DummyRAGService:
-        async def update_rag_index(self, *args, **kwargs):
-            logger.warning("DummyRAGService: update_rag_index called, but service is not initialized.")
-        async def ask_question(self, *args, **kwargs):
-            logger.warning("DummyRAGService: ask_question called, but service is not initialized.")
-            return "RAG service is not available due to an initialization error."
-    rag_service = DummyRAGService()
\ No newline at end of file
+    async def astream_answer(self, query: str, company_id: str) -> AsyncIterator[str]:
+        """Like ask_question, but yields the answer text as the LLM generates it."""
+        unavailable_message = await self._ensure_index(company_id)
+        if unavailable_message:
+            yield unavailable_message
+            return
+
+        try:
+            rag_chain = await self._get_rag_chain(company_id)
+            logger.info(f"Streaming RAG chain for company {company_id} with query: '{query[:50]}...'")
+            async for token in rag_chain.astream(query):
+                yield token
+            logger.info(f"RAG chain stream complete for company {company_id}.")
+
+        except Exception as e:
+            logger.error(f"Error during streaming RAG question answering for {company_id}: {e}", exc_info=True)
+            yield "Sorry, I encountered an internal error while trying to answer your question based on the available documents."
+
+class DummyRAGService:
+    """Stand-in used when the RAG service fails to initialize (e.g., missing API key), so callers don't crash."""
+    async def update_rag_index(self, *args, **kwargs):
+        logger.warning("DummyRAGService: update_rag_index called, but service is not initialized.")
+    async def ask_question(self, *args, **kwargs):
+        logger.warning("DummyRAGService: ask_question called, but service is not initialized.")
+        return "RAG service is not available due to an initialization error."
+    async def astream_answer(self, *args, **kwargs):
+        logger.warning("DummyRAGService: astream_answer called, but service is not initialized.")
+        yield "RAG service is not available due to an initialization error."
+
+@lru_cache(maxsize=1)
+def get_rag_service():
+    """Returns the shared RAG service, creating it on first use rather than at import time."""
+    try:
+        return RAGService()
+    except Exception:
+        logger.error("RAG Service failed to initialize. Using a dummy service.", exc_info=True)
+        return DummyRAGService()
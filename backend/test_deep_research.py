@@ -5,93 +5,273 @@ Competitive Intelligence Agent - Deep Research Test Script
 This script tests the deep research workflow for one or multiple competitors.
 
 Usage:
-    python test_deep_research.py [company_name]
+    python test_deep_research.py [company_name] [--verbose] [--mode single|multiple] [--select 1,3] [--max-wait MINUTES]
 
 Example:
     python test_deep_research.py "Salesforce"
+    python test_deep_research.py "Salesforce" --mode multiple --select 1,2   # unattended
 """
 
 import os
 import sys
 import json
 import time
-import requests
+import re
+import hashlib
+import io
+import random
+import shutil
+import tempfile
+import asyncio
+import aiohttp
 import logging
 import argparse
+from email.message import Message
 from dotenv import load_dotenv
 
+try:
+    import orjson # Optional: faster JSON serialization and parsing
+except ImportError:
+    orjson = None
+
+try:
+    import uvloop # Optional: faster event loop
+except ImportError:
+    uvloop = None
+
+# Parses raw response bytes, skipping the separate text-decode step of response.json()
+_json_loads = orjson.loads if orjson is not None else json.loads
+
+# Request bodies are serialized here and sent as data=, bypassing aiohttp's stdlib-json json= path
+if orjson is not None:
+    _json_dumps = orjson.dumps
+else:
+    def _json_dumps(data) -> bytes:
+        return json.dumps(data).encode("utf-8")
+
+_JSON_HEADERS = {"Content-Type": "application/json"}
+
 # Ensure we load environment variables
 load_dotenv()
 
-# Set up logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
 logger = logging.getLogger('test_deep_research')
 
 # API base URL
 API_BASE_URL = "http://localhost:8000"
 
+_SEP = "-" * 40
+_BIGSEP = "=" * 80
+
+def _banner(*title_lines, sep=_SEP):
+    """Print a section banner (title lines between two separators) with a single write."""
+    print("\n".join(("", sep, *title_lines, sep)))
+
+# Default request timeouts in seconds; long-polls and downloads set their own
+REQUEST_TIMEOUT = aiohttp.ClientTimeout(total=60, sock_read=30)
+# Downloads may stream for a while, but a stalled stream (no bytes for sock_read seconds,
+# which also covers the server rendering the PDF) aborts instead of hanging the run
+DOWNLOAD_TIMEOUT = aiohttp.ClientTimeout(total=600, connect=5, sock_read=60)
+
+# Reports are copied to disk in 1 MiB chunks through a matching write buffer, rather than
+# one Python-level write per 8 KB
+DOWNLOAD_CHUNK_SIZE = 1 << 20
+
+# Directory downloaded PDFs are saved to; created once at the start of the flow
+DOWNLOAD_DIR = "test_downloads"
+
+_UNSAFE_FILENAME_CHARS = re.compile(r'[^A-Za-z0-9 _]+')
+
+def _sanitize_filename(name):
+    """Reduce a competitor or company name to a filesystem-safe filename stem."""
+    return _UNSAFE_FILENAME_CHARS.sub('', name).rstrip() or 'report'
+
+def _attachment_filename(content_disp, fallback):
+    """The filename from a Content-Disposition header, or `fallback` if it has none.
+
+    Parsed with the email package so quoted values and RFC 5987 filename*= forms are handled.
+    """
+    header = Message()
+    header["Content-Disposition"] = content_disp
+    filename = header.get_filename()
+    return os.path.basename(filename) if filename else fallback
+
+# Local copies of downloaded PDFs, revalidated with the server's ETag so a re-run for the same
+# company skips rendering and transferring reports that haven't changed. Keyed by competitor ID,
+# or by the set of IDs for a combined report.
+REPORT_CACHE_DIR = os.path.join(tempfile.gettempdir(), "ci-agent-reports")
+
+def _combined_cache_key(competitor_ids):
+    return "combined_" + hashlib.blake2b(",".join(sorted(competitor_ids)).encode("utf-8"), digest_size=8).hexdigest()
+
+def _report_cache_paths(cache_key):
+    base = os.path.join(REPORT_CACHE_DIR, _sanitize_filename(cache_key))
+    return base + ".pdf", base + ".json"
+
+def _cached_report(cache_key):
+    """{"etag", "filename"} of the cached PDF for this key, or None if there isn't one."""
+    pdf_path, meta_path = _report_cache_paths(cache_key)
+    try:
+        with open(meta_path, "rb") as f:
+            meta = _json_loads(f.read())
+    except (OSError, ValueError):
+        return None
+    return meta if os.path.exists(pdf_path) else None
+
+def _cache_report(cache_key, etag, filename, save_path):
+    pdf_path, meta_path = _report_cache_paths(cache_key)
+    os.makedirs(REPORT_CACHE_DIR, exist_ok=True)
+    shutil.copyfile(save_path, pdf_path)
+    with open(meta_path, "wb") as f:
+        f.write(_json_dumps({"etag": etag, "filename": filename}))
+
+# Report downloads run concurrently, at most this many at a time
+MAX_CONCURRENT_DOWNLOADS = 8
+
+async def gather_limited(coros, limit=MAX_CONCURRENT_DOWNLOADS):
+    """Like asyncio.gather, but runs at most `limit` of the coroutines at once."""
+    semaphore = asyncio.Semaphore(limit)
+
+    async def run(coro):
+        async with semaphore:
+            return await coro
+
+    return await asyncio.gather(*(run(coro) for coro in coros))
+
+def create_session():
+    """Create the client session shared by every request in a run.
+
+    One pooled session means polls and downloads reuse keep-alive connections instead of
+    reconnecting each time, and concurrent downloads share the same pool.
+    """
+    connector = aiohttp.TCPConnector(limit=16, keepalive_timeout=30)
+    return aiohttp.ClientSession(base_url=API_BASE_URL, connector=connector, timeout=REQUEST_TIMEOUT)
+
+# Conditional-GET cache: path -> (ETag, parsed body) of the last 200 response. The ETag is
+# sent back as If-None-Match, and a 304 reuses the parsed body instead of transferring and
+# decoding the same JSON again.
+_etag_cache = {}
+
+async def cached_get(session, path, **kwargs):
+    """GET `path` conditionally and return (status, body).
+
+    A 304 comes back as (200, cached body). Any other status drops the cached entry.
+    """
+    cached = _etag_cache.get(path)
+    headers = {"If-None-Match": cached[0]} if cached else None
+    async with session.get(path, headers=headers, **kwargs) as response:
+        status = response.status
+        if status == 304 and cached:
+            return 200, cached[1]
+        body = _json_loads(await response.read()) if status == 200 else await response.text()
+        etag = response.headers.get("ETag")
+    if status == 200 and etag:
+        _etag_cache[path] = (etag, body)
+    else:
+        _etag_cache.pop(path, None)
+    return status, body
+
+# Long-poll window for the competitors endpoint: the server holds a request that carries the
+# last ETag seen until the competitor list changes or this many milliseconds pass
+LONG_POLL_WAIT_MS = 25000
+
+def competitors_path(company_id):
+    return f"/api/company/{company_id}/competitors"
+
+async def get_competitors_update(session, company_id):
+    """GET the company's competitors, long-polling for a change since the previous call.
+
+    Returns (status, data) as cached_get does; if nothing changed within the wait window,
+    data is the previous response.
+    """
+    return await cached_get(
+        session,
+        competitors_path(company_id),
+        params={"wait_ms": LONG_POLL_WAIT_MS},
+        timeout=aiohttp.ClientTimeout(total=LONG_POLL_WAIT_MS / 1000 + 10)
+    )
+
+# Backoff between polls: start short so early completions are seen quickly, grow the delay
+# geometrically up to a ceiling, and add jitter so concurrent test clients don't poll in lockstep
+POLL_DELAY_START = 2.0
+POLL_DELAY_FACTOR = 1.5
+POLL_DELAY_CAP = 30.0
+
+async def backoff_sleep(delay):
+    """Sleep for the current delay plus jitter and return the next, longer delay."""
+    await asyncio.sleep(delay + random.uniform(0, 1))
+    return min(delay * POLL_DELAY_FACTOR, POLL_DELAY_CAP)
+
+# Failed polls back off on their own, faster-growing schedule, reset by the next success
+ERROR_DELAY_START = 2.0
+ERROR_DELAY_CAP = 60.0
+
+async def error_backoff_sleep(error_delay):
+    """Sleep after a failed poll and return the doubled delay for the next failure."""
+    await asyncio.sleep(error_delay + random.uniform(0, 1))
+    return min(error_delay * 2, ERROR_DELAY_CAP)
+
+async def pause_between_polls(company_id, delay):
+    """Back off between polls only if the server doesn't long-poll (it already waited for a change)."""
+    if competitors_path(company_id) not in _etag_cache:
+        return await backoff_sleep(delay)
+    return delay
+
 # --- Helper Functions (Mostly copied/adapted from test_api.py) ---
 
-def test_health_check():
+async def test_health_check(session):
     """Test the health check endpoint."""
-    print("\n" + "-"*40)
-    print("Checking API Health...")
-    print("-"*40)
+    _banner("Checking API Health...")
     try:
-        response = requests.get(f"{API_BASE_URL}/health")
-        if response.status_code == 200 and response.json().get("status") == "healthy":
+        async with session.get("/health") as response:
+            status = response.status
+            body = await response.text()
+        if status == 200 and _json_loads(body).get("status") == "healthy":
             print("API is healthy.")
             return True
         else:
-            print(f"API health check failed: Status {response.status_code}, Response: {response.text}")
+            print(f"API health check failed: Status {status}, Response: {body}")
             return False
     except Exception as e:
-        logger.error(f"Error in health check: {e}")
+        logger.error("Error in health check: %s", e)
         print(f"ERROR checking API health: {e}")
         return False
 
-def analyze_company(company_name: str):
+async def analyze_company(session, company_name: str):
     """Initiates company analysis and returns company_id."""
-    print("\n" + "-"*40)
-    print(f"Initiating Analysis for Company: {company_name}")
-    print("-"*40)
+    _banner(f"Initiating Analysis for Company: {company_name}")
     try:
         # Payload for registering a new company analysis
         payload = {"name": company_name}
-        
-        response = requests.post(f"{API_BASE_URL}/api/company", json=payload)
-        print(f"Status code: {response.status_code}")
-        
-        if response.status_code not in (200, 201):
-            print(f"Response text: {response.text}")
-            return None
-            
-        data = response.json()
+
+        async with session.post("/api/company", data=_json_dumps(payload), headers=_JSON_HEADERS) as response:
+            print(f"Status code: {response.status}")
+
+            if response.status not in (200, 201):
+                print(f"Response text: {await response.text()}")
+                return None
+
+            data = _json_loads(await response.read())
         company_id = data.get("id")
         print(f"Company created with ID: {company_id}")
         return company_id
     except Exception as e:
-        logger.error(f"Error in company analysis: {e}")
+        logger.error("Error in company analysis: %s", e)
         print(f"ERROR: {e}")
         return None
 
-def wait_for_competitors(company_id, max_wait_minutes=5):
+async def wait_for_competitors(session, company_id, max_wait_minutes=5):
     """Polls until competitors are available."""
-    print("\n" + "-"*40)
-    print(f"Waiting for Competitors for Company ID: {company_id} (Max Wait: {max_wait_minutes} mins)")
-    print("-"*40)
+    _banner(f"Waiting for Competitors for Company ID: {company_id} (Max Wait: {max_wait_minutes} mins)")
     start_time = time.time()
     max_wait_seconds = max_wait_minutes * 60
-    poll_interval = 10 # Check every 10 seconds
+    delay = POLL_DELAY_START
+    error_delay = ERROR_DELAY_START
 
     while time.time() - start_time < max_wait_seconds:
         try:
-            response = requests.get(f"{API_BASE_URL}/api/company/{company_id}/competitors")
-            if response.status_code == 200:
-                competitors_data = response.json()
+            status, competitors_data = await get_competitors_update(session, company_id)
+            if status == 200:
+                error_delay = ERROR_DELAY_START
                 competitors_list = competitors_data.get('competitors')
                 # Check if the 'competitors' key exists and the list is not None or empty
                 if isinstance(competitors_list, list) and len(competitors_list) > 0:
@@ -99,84 +279,86 @@ def wait_for_competitors(company_id, max_wait_minutes=5):
                     return competitors_list # Return just the list of competitors
                 else:
                     print(f"Competitors list empty or not ready yet. Waiting... (Elapsed: {int(time.time() - start_time)}s)")
-            elif response.status_code == 404:
+            elif status == 404:
                 print(f"Company {company_id} not found (yet?). Waiting...")
             else:
-                print(f"Polling failed: Status {response.status_code}. Waiting...")
+                print(f"Polling failed: Status {status}. Waiting...")
+                error_delay = await error_backoff_sleep(error_delay)
+                continue
 
-            time.sleep(poll_interval)
+            delay = await pause_between_polls(company_id, delay)
         except Exception as e:
-            logger.error(f"Error polling for competitors: {e}")
+            logger.error("Error polling for competitors: %s", e)
             print(f"ERROR polling: {e}")
-            time.sleep(poll_interval)
+            error_delay = await error_backoff_sleep(error_delay)
 
     print(f"TIMEOUT: Competitors did not appear for {company_id} within {max_wait_minutes} minutes.")
     return None
 
-def trigger_deep_research(competitor_id: str):
+async def trigger_deep_research(session, competitor_id: str):
     """Triggers deep research for a specific competitor."""
-    print("\n" + "-"*40)
-    print(f"Triggering Deep Research for Competitor ID: {competitor_id}")
-    print("-"*40)
+    _banner(f"Triggering Deep Research for Competitor ID: {competitor_id}")
     try:
-        response = requests.post(f"{API_BASE_URL}/api/competitor/{competitor_id}/deep-research")
-        print(f"Status code: {response.status_code}")
-        if response.status_code != 200:
-            print(f"Error response: {response.text}")
-            return False
-        data = response.json()
+        async with session.post(f"/api/competitor/{competitor_id}/deep-research") as response:
+            print(f"Status code: {response.status}")
+            if response.status != 200:
+                print(f"Error response: {await response.text()}")
+                return False
+            data = _json_loads(await response.read())
         print(f"Response: {data}")
-        if data.get("status") == "pending" or "already in progress" in data.get("message", ""):
+        if data.get("status") == "pending" or data.get("code") == "ALREADY_RUNNING":
              print("Deep research trigger successful or already running.")
              return True
         else:
              print("Deep research trigger failed.")
              return False
     except Exception as e:
-        logger.error(f"Error triggering deep research: {e}")
+        logger.error("Error triggering deep research: %s", e)
         print(f"ERROR: {e}")
         return False
 
-def trigger_multiple_deep_research(competitor_ids: list):
+async def trigger_multiple_deep_research(session, competitor_ids: list):
     """Triggers deep research for multiple competitors at once."""
-    print("\n" + "-"*40)
-    print(f"Triggering Deep Research for {len(competitor_ids)} Competitors")
-    print("-"*40)
+    _banner(f"Triggering Deep Research for {len(competitor_ids)} Competitors")
     try:
-        response = requests.post(
-            f"{API_BASE_URL}/api/competitor/deep-research/multiple", 
-            json={"competitor_ids": competitor_ids}
-        )
-        print(f"Status code: {response.status_code}")
-        if response.status_code != 200:
-            print(f"Error response: {response.text}")
-            return False
-        data = response.json()
+        async with session.post(
+            "/api/competitor/deep-research/multiple",
+            data=_json_dumps({"competitor_ids": competitor_ids}),
+            headers=_JSON_HEADERS
+        ) as response:
+            print(f"Status code: {response.status}")
+            if response.status != 200:
+                print(f"Error response: {await response.text()}")
+                return False
+            data = _json_loads(await response.read())
         print(f"Response: {data}")
         return True
     except Exception as e:
-        logger.error(f"Error triggering multiple deep research: {e}")
+        logger.error("Error triggering multiple deep research: %s", e)
         print(f"ERROR: {e}")
         return False
 
-def check_deep_research_status(company_id: str, competitor_id: str, target_status: str = "completed", max_wait_minutes: int = 15):
+async def check_deep_research_status(session, company_id: str, competitor_id: str, target_status: str = "completed", max_wait_minutes: int = 15):
     """Polls the competitors endpoint until the research status matches the target."""
-    print("\n" + "-"*40)
-    print(f"Polling Deep Research Status for {competitor_id} (Target: {target_status}, Max Wait: {max_wait_minutes} mins)")
-    print("-"*40)
+    _banner(f"Polling Deep Research Status for {competitor_id} (Target: {target_status}, Max Wait: {max_wait_minutes} mins)")
     start_time = time.time()
     max_wait_seconds = max_wait_minutes * 60
-    poll_interval = 20 # Check less frequently for long tasks
+    delay = POLL_DELAY_START
+    error_delay = ERROR_DELAY_START
+    last_status = None
 
     while time.time() - start_time < max_wait_seconds:
         try:
-            response = requests.get(f"{API_BASE_URL}/api/company/{company_id}/competitors")
-            if response.status_code == 200:
-                competitors_data = response.json()
+            status, competitors_data = await get_competitors_update(session, company_id)
+            if status == 200:
+                error_delay = ERROR_DELAY_START
                 target_competitor = next((c for c in competitors_data.get('competitors', []) if c['id'] == competitor_id), None)
 
                 if target_competitor:
                     current_status = target_competitor.get("deep_research_status")
+                    if current_status != last_status:
+                        delay = POLL_DELAY_START # Progress was made, poll eagerly again
+                        last_status = current_status
                     print(f"Polling... Current status for {competitor_id}: {current_status} (Elapsed: {int(time.time() - start_time)}s)")
                     if current_status == target_status:
                         print(f"Target status '{target_status}' reached!")
@@ -191,309 +373,293 @@ def check_deep_research_status(company_id: str, competitor_id: str, target_statu
                     return None # Competitor disappeared?
 
             else:
-                print(f"Polling competitors endpoint failed: Status {response.status_code}")
+                print(f"Polling competitors endpoint failed: Status {status}")
+                error_delay = await error_backoff_sleep(error_delay)
+                continue
 
-            time.sleep(poll_interval)
+            delay = await pause_between_polls(company_id, delay)
         except Exception as e:
-            logger.error(f"Error polling deep research status: {e}")
+            logger.error("Error polling deep research status: %s", e)
             print(f"ERROR polling: {e}")
-            time.sleep(poll_interval)
+            error_delay = await error_backoff_sleep(error_delay)
 
     print(f"TIMEOUT: Deep research for {competitor_id} did not reach status '{target_status}' within {max_wait_minutes} minutes.")
     return None
 
-def check_multiple_research_status(company_id: str, competitor_ids: list, target_status: str = "completed", max_wait_minutes: int = 20):
-    """Polls the competitors endpoint until all research statuses match the target."""
-    print("\n" + "-"*40)
-    print(f"Polling Deep Research Status for {len(competitor_ids)} competitors (Target: {target_status}, Max Wait: {max_wait_minutes} mins)")
-    print("-"*40)
+async def get_research_statuses(session, competitor_ids: list):
+    """Fetch just the research status of each competitor (no markdown) in one request."""
+    async with session.post(
+        "/api/competitor/status/batch",
+        data=_json_dumps({"competitor_ids": competitor_ids}),
+        headers=_JSON_HEADERS
+    ) as response:
+        status = response.status
+        body = _json_loads(await response.read()) if status == 200 else await response.text()
+    return status, body
+
+async def get_research_result(session, competitor_id: str):
+    """Fetch one competitor's research status and markdown."""
+    async with session.get(f"/api/competitor/{competitor_id}/deep-research") as response:
+        response.raise_for_status()
+        return _json_loads(await response.read())
+
+async def check_multiple_research_status(session, competitor_ids: list, target_status: str = "completed", max_wait_minutes: int = 20):
+    """Polls the batch status endpoint until all research statuses match the target.
+
+    Polls only carry {id, name, status}; each report's markdown is fetched once, when that
+    competitor first reaches the target (or error) status.
+    """
+    _banner(f"Polling Deep Research Status for {len(competitor_ids)} competitors (Target: {target_status}, Max Wait: {max_wait_minutes} mins)")
     start_time = time.time()
     max_wait_seconds = max_wait_minutes * 60
-    poll_interval = 30  # Check less frequently for multiple long tasks
+    delay = POLL_DELAY_START
+    error_delay = ERROR_DELAY_START
+    last_counts = None
 
     # Store the competitors that have reached completion
     completed_competitors = {}
-    
+    reported_errors = set()
+
     while time.time() - start_time < max_wait_seconds:
         try:
-            response = requests.get(f"{API_BASE_URL}/api/company/{company_id}/competitors")
-            if response.status_code == 200:
-                competitors_data = response.json()
-                all_competitors = competitors_data.get('competitors', [])
-                
-                # Filter to just our target competitors
-                target_competitors = [c for c in all_competitors if c['id'] in competitor_ids]
-                
+            status, status_data = await get_research_statuses(session, competitor_ids)
+            if status == 200:
+                error_delay = ERROR_DELAY_START
                 # Count statuses
                 status_counts = {"completed": 0, "pending": 0, "error": 0, "not_started": 0}
-                
+
                 # Update our completed_competitors dict with any newly completed ones
-                for competitor in target_competitors:
+                for competitor in status_data.get('statuses', []):
                     comp_id = competitor['id']
-                    status = competitor.get("deep_research_status")
-                    
+                    research_status = competitor.get("deep_research_status")
+
                     # Count statuses
-                    if status in status_counts:
-                        status_counts[status] += 1
-                    
-                    # Store completed competitor data
-                    if status == target_status and comp_id not in completed_competitors:
-                        completed_competitors[comp_id] = competitor
-                    
+                    if research_status in status_counts:
+                        status_counts[research_status] += 1
+
+                    # Fetch completed competitor data
+                    if research_status == target_status and comp_id not in completed_competitors:
+                        completed_competitors[comp_id] = await get_research_result(session, comp_id)
+
                     # Report errors
-                    if status == "error" and comp_id not in completed_competitors:
+                    if research_status == "error" and comp_id not in reported_errors:
+                        reported_errors.add(comp_id)
+                        result = await get_research_result(session, comp_id)
                         print(f"ERROR status reported for {competitor['name']} ({comp_id})")
-                        print(f"Error Markdown: {competitor.get('deep_research_markdown', 'N/A')[:200]}...")
-                
+                        print(f"Error Markdown: {(result.get('deep_research_markdown') or 'N/A')[:200]}...")
+
+                if status_counts != last_counts:
+                    delay = POLL_DELAY_START # Progress was made, poll eagerly again
+                    last_counts = status_counts
+
                 # Print status summary
                 elapsed = int(time.time() - start_time)
                 print(f"Polling... Status summary: {status_counts} (Elapsed: {elapsed}s)")
-                
+
                 # Check if all are completed
                 if len(completed_competitors) == len(competitor_ids):
                     print(f"All {len(competitor_ids)} competitors have reached '{target_status}' status!")
                     return list(completed_competitors.values())
-                
+
+                # Stop once every competitor is terminal; errored ones won't complete later
+                if len(completed_competitors) + len(reported_errors) == len(competitor_ids):
+                    print(f"All {len(competitor_ids)} competitors finished: {len(completed_competitors)} completed, {len(reported_errors)} with errors.")
+                    return list(completed_competitors.values()) or None
+
                 # Check if any error statuses mean we should abort
                 if status_counts["error"] > 0:
                     print(f"Some competitors have error status. Continuing to wait for others...")
-                
+
             else:
-                print(f"Polling competitors endpoint failed: Status {response.status_code}")
+                print(f"Polling research status endpoint failed: Status {status}")
+                error_delay = await error_backoff_sleep(error_delay)
+                continue
 
-            time.sleep(poll_interval)
+            delay = await backoff_sleep(delay)
         except Exception as e:
-            logger.error(f"Error polling multiple research status: {e}")
+            logger.error("Error polling multiple research status: %s", e)
             print(f"ERROR polling: {e}")
-            time.sleep(poll_interval)
+            error_delay = await error_backoff_sleep(error_delay)
 
     # If we get here, we timed out. Return what we have.
     print(f"TIMEOUT: Not all competitors reached '{target_status}' within {max_wait_minutes} minutes.")
     print(f"Completed: {len(completed_competitors)} of {len(competitor_ids)}")
-    
+
     if completed_competitors:
         return list(completed_competitors.values())
     return None
 
-def download_research_pdf(competitor_id: str, competitor_name: str):
-    """Downloads the deep research PDF report and checks headers."""
-    print("\n" + "-"*40)
-    print(f"Attempting to Download Deep Research PDF for: {competitor_name} ({competitor_id})")
-    print("-"*40)
-    download_dir = "test_downloads" # Optional: Directory to save PDFs
-    if not os.path.exists(download_dir):
-        os.makedirs(download_dir)
+async def _download_report(session, method: str, path: str, *, label: str, expected_type: str, fallback_filename: str, min_bytes: int = 100, cache_key: str = None, headers: dict = None, **request_kwargs):
+    """Request a report, check its headers and stream the body into DOWNLOAD_DIR.
 
+    With a cache_key, the locally cached copy's ETag is sent as If-None-Match: a 304 copies
+    that file into DOWNLOAD_DIR instead, and a fresh download replaces the cached copy.
+    Returns True if the report was saved.
+    """
+    cached = _cached_report(cache_key) if cache_key else None
+    if cached:
+        headers = {**(headers or {}), "If-None-Match": cached["etag"]}
     try:
-        response = requests.get(f"{API_BASE_URL}/api/competitor/{competitor_id}/deep-research/download", stream=True, timeout=60)
-        print(f"Status code: {response.status_code}")
-        response.raise_for_status() # Raise HTTPError for bad responses (4xx or 5xx)
-
-        print(f"Headers: {response.headers}")
-        content_type = response.headers.get('content-type')
-        content_disp = response.headers.get('Content-Disposition')
-
-        # Check for PDF content type
-        if content_type == 'application/pdf' and content_disp:
-            # Extract filename safely
-            filename_part = content_disp.split('filename=')[-1]
-            if filename_part:
-                filename = filename_part.strip('"')
-            else: # Fallback filename
-                 safe_name = "".join(c for c in competitor_name if c.isalnum() or c in (' ', '_')).rstrip()
-                 filename = f"{safe_name}_Deep_Research_Report.pdf" # Ensure .pdf
-
-            save_path = os.path.join(download_dir, filename)
-            print(f"Attempting to save PDF as: {save_path}")
-            content_length = 0
-            try:
-                with open(save_path, 'wb') as f:
-                    for chunk in response.iter_content(chunk_size=8192):
-                        f.write(chunk)
-                        content_length += len(chunk)
-                if content_length > 100: # Basic check: is the PDF file reasonably sized?
-                    print(f"Successfully saved PDF ({content_length} bytes): {save_path}")
-                    return True
-                else:
-                    print(f"ERROR: Saved PDF file seems too small ({content_length} bytes). Check content.")
-                    return False
-            except Exception as save_err:
-                logger.error(f"Error saving PDF file {save_path}: {save_err}")
-                print(f"ERROR saving PDF: {save_err}")
+        async with session.request(method, path, headers=headers, timeout=DOWNLOAD_TIMEOUT, **request_kwargs) as response:
+            print(f"Status code: {response.status}")
+            if response.status == 304 and cached:
+                save_path = os.path.join(DOWNLOAD_DIR, cached["filename"])
+                shutil.copyfile(_report_cache_paths(cache_key)[0], save_path)
+                print(f"Report unchanged since the last run; copied cached {label} to: {save_path}")
+                return True
+            if response.status >= 400:
+                # Print response text, might contain error details
+                print(f"ERROR downloading {label}: HTTP {response.status}")
+                print(f"Error Response Text (first 500 chars): {(await response.text())[:500]}")
                 return False
-        else:
-            print("ERROR: Invalid headers received for PDF download.")
-            print(f"Content-Type: {content_type}, Content-Disposition: {content_disp}")
-            # Print response text if not PDF, might contain error details
-            if content_type != 'application/pdf':
-                 print(f"Response Text (first 500 chars): {response.text[:500]}")
-            return False
-    except requests.exceptions.RequestException as e:
-        logger.error(f"Error downloading PDF: {e}")
-        print(f"ERROR downloading PDF: {e}")
-        # Print response text if available on error
-        if hasattr(e, 'response') and e.response is not None:
-             print(f"Error Response Text (first 500 chars): {e.response.text[:500]}")
-        return False
-    except Exception as e: # Catch other potential errors
-         logger.error(f"Unexpected error during PDF download: {e}")
-         print(f"UNEXPECTED ERROR during PDF download: {e}")
-         return False
 
-def download_combined_research_pdf(competitor_ids: list, company_name: str):
-    """Downloads the combined research PDF for multiple competitors."""
-    print("\n" + "-"*40)
-    print(f"Attempting to Download Combined Research PDF for {len(competitor_ids)} competitors")
-    print("-"*40)
-    download_dir = "test_downloads"
-    if not os.path.exists(download_dir):
-        os.makedirs(download_dir)
+            logger.debug("Headers: %s", response.headers)
+            content_type = response.content_type
+            content_disp = response.headers.get('Content-Disposition')
 
-    try:
-        response = requests.post(
-            f"{API_BASE_URL}/api/competitor/deep-research/multiple/download",
-            json={"competitor_ids": competitor_ids},
-            stream=True,
-            timeout=60
-        )
-        print(f"Status code: {response.status_code}")
-        response.raise_for_status()
+            if content_type != expected_type or not content_disp:
+                print(f"ERROR: Invalid headers received for {label} download.")
+                print(f"Content-Type: {content_type}, Content-Disposition: {content_disp}")
+                # Print response text if it's not the report, might contain error details
+                if content_type != expected_type:
+                     print(f"Response Text (first 500 chars): {(await response.text())[:500]}")
+                return False
 
-        print(f"Headers: {response.headers}")
-        content_type = response.headers.get('content-type')
-        content_disp = response.headers.get('Content-Disposition')
-
-        if content_type == 'application/pdf' and content_disp:
-            # Extract filename safely
-            filename_part = content_disp.split('filename=')[-1]
-            if filename_part:
-                filename = filename_part.strip('"')
-            else: # Fallback filename
-                 safe_name = "".join(c for c in company_name if c.isalnum() or c in (' ', '_')).rstrip()
-                 filename = f"{safe_name}_Combined_Research_Report.pdf" # Ensure .pdf
-
-            save_path = os.path.join(download_dir, filename)
-            print(f"Attempting to save combined PDF as: {save_path}")
+            filename = _attachment_filename(content_disp, fallback_filename)
+            save_path = os.path.join(DOWNLOAD_DIR, filename)
+            print(f"Attempting to save {label} as: {save_path}")
             content_length = 0
             try:
-                with open(save_path, 'wb') as f:
-                    for chunk in response.iter_content(chunk_size=8192):
+                with open(save_path, 'wb', buffering=DOWNLOAD_CHUNK_SIZE) as f:
+                    async for chunk in response.content.iter_chunked(DOWNLOAD_CHUNK_SIZE):
                         f.write(chunk)
                         content_length += len(chunk)
-                if content_length > 100: # Basic check
-                    print(f"Successfully saved combined PDF ({content_length} bytes): {save_path}")
-                    return True
-                else:
-                     print(f"ERROR: Saved combined PDF seems too small ({content_length} bytes). Check content.")
-                     return False
-            except Exception as save_err:
-                logger.error(f"Error saving combined PDF file {save_path}: {save_err}")
-                print(f"ERROR saving combined PDF: {save_err}")
+            except OSError as save_err:
+                logger.error("Error saving %s file %s: %s", label, save_path, save_err)
+                print(f"ERROR saving {label}: {save_err}")
                 return False
-        else:
-            print("ERROR: Invalid headers received for combined PDF download.")
-            print(f"Content-Type: {content_type}, Content-Disposition: {content_disp}")
-            if content_type != 'application/pdf':
-                 print(f"Response Text (first 500 chars): {response.text[:500]}")
-            return False
-    except requests.exceptions.RequestException as e:
-        logger.error(f"Error downloading combined PDF: {e}")
-        print(f"ERROR downloading combined PDF: {e}")
-        if hasattr(e, 'response') and e.response is not None:
-             print(f"Error Response Text (first 500 chars): {e.response.text[:500]}")
+
+            if content_length <= min_bytes: # Basic check: is the file reasonably sized?
+                print(f"ERROR: Saved {label} seems too small ({content_length} bytes). Check content.")
+                return False
+            print(f"Successfully saved {label} ({content_length} bytes): {save_path}")
+
+            if cache_key and response.headers.get("ETag"):
+                try:
+                    _cache_report(cache_key, response.headers["ETag"], filename, save_path)
+                except OSError as cache_err:
+                    logger.warning("Could not cache %s for %s: %s", label, cache_key, cache_err)
+            return True
+    except aiohttp.ClientError as e:
+        logger.error("Error downloading %s: %s", label, e)
+        print(f"ERROR downloading {label}: {e}")
         return False
     except Exception as e: # Catch other potential errors
-         logger.error(f"Unexpected error during combined PDF download: {e}")
-         print(f"UNEXPECTED ERROR during combined PDF download: {e}")
+         logger.error("Unexpected error during %s download: %s", label, e)
+         print(f"UNEXPECTED ERROR during {label} download: {e}")
          return False
 
-def download_combined_research_html(competitor_ids: list, company_name: str):
+async def download_research_pdf(session, competitor_id: str, competitor_name: str):
+    """Downloads the deep research PDF report, reusing the cached copy if it hasn't changed."""
+    _banner(f"Attempting to Download Deep Research PDF for: {competitor_name} ({competitor_id})")
+    return await _download_report(
+        session, "GET", f"/api/competitor/{competitor_id}/deep-research/download",
+        label="PDF",
+        expected_type="application/pdf",
+        fallback_filename=f"{_sanitize_filename(competitor_name)}_Deep_Research_Report.pdf",
+        cache_key=competitor_id
+    )
+
+async def download_combined_research_pdf(session, competitor_ids: list, company_name: str):
+    """Downloads the combined research PDF for multiple competitors, reusing the cached copy if it hasn't changed."""
+    _banner(f"Attempting to Download Combined Research PDF for {len(competitor_ids)} competitors")
+    return await _download_report(
+        session, "POST", "/api/competitor/deep-research/multiple/download",
+        label="combined PDF",
+        expected_type="application/pdf",
+        fallback_filename=f"{_sanitize_filename(company_name)}_Combined_Research_Report.pdf",
+        cache_key=_combined_cache_key(competitor_ids),
+        data=_json_dumps({"competitor_ids": competitor_ids}),
+        headers=_JSON_HEADERS
+    )
+
+async def download_combined_research_html(session, competitor_ids: list, company_name: str):
     """Downloads the combined research HTML for multiple competitors."""
-    print("\n" + "-"*40)
-    print(f"Attempting to Download Combined Research HTML for {len(competitor_ids)} competitors")
-    print("-"*40)
-    try:
-        response = requests.post(
-            f"{API_BASE_URL}/api/competitor/deep-research/multiple/download", 
-            json={"competitor_ids": competitor_ids},
-            stream=True
-        )
-        print(f"Status code: {response.status_code}")
-
-        if response.status_code == 200:
-            print(f"Headers: {response.headers}")
-            content_type = response.headers.get('content-type')
-            content_disp = response.headers.get('Content-Disposition')
-
-            if content_type == 'text/html' and content_disp:
-                # Extract filename safely
-                filename_part = content_disp.split('filename=')[-1]
-                if filename_part:
-                    filename = filename_part.strip('"')
-                else: # Fallback filename
-                     safe_name = "".join(c for c in company_name if c.isalnum() or c in (' ', '_')).rstrip()
-                     filename = f"{safe_name}_Combined_Research_Report.html"
-
-                print(f"Attempting to save combined HTML as: {filename}")
-                try:
-                    with open(filename, 'wb') as f:
-                        for chunk in response.iter_content(chunk_size=8192):
-                            f.write(chunk)
-                    print(f"Successfully saved HTML: {filename}")
-                    return True
-                except Exception as save_err:
-                    logger.error(f"Error saving combined HTML file {filename}: {save_err}")
-                    print(f"ERROR saving HTML: {save_err}")
-                    return False
-            else:
-                print("ERROR: Invalid headers received for HTML download.")
-                print(f"Content-Type: {content_type}, Content-Disposition: {content_disp}")
-                return False
-        else:
-            print(f"Error response during download: {response.text}")
-            return False
-    except Exception as e:
-        logger.error(f"Error downloading combined HTML: {e}")
-        print(f"ERROR downloading combined HTML: {e}")
-        return False
+    _banner(f"Attempting to Download Combined Research HTML for {len(competitor_ids)} competitors")
+    return await _download_report(
+        session, "POST", "/api/competitor/deep-research/multiple/download",
+        label="combined HTML",
+        expected_type="text/html",
+        fallback_filename=f"{_sanitize_filename(company_name)}_Combined_Research_Report.html",
+        data=_json_dumps({"competitor_ids": competitor_ids}),
+        headers=_JSON_HEADERS
+    )
 
 # --- Main Test Workflow ---
 
-def test_deep_research_flow(company_name: str):
-    """Runs the test sequence for deep research."""
-
-    print("\n" + "="*80)
-    print(f"STARTING DEEP RESEARCH TEST FOR COMPANY: {company_name}")
-    print("="*80 + "\n")
+def _print_competitor_list(competitors):
+    """Print the numbered competitor menu with a single stdout write."""
+    buf = io.StringIO()
+    buf.write("\nAvailable Competitors:\n")
+    for idx, comp in enumerate(competitors):
+        buf.write(f"{idx + 1}. {comp['name']} (ID: {comp['id']})\n")
+    sys.stdout.write(buf.getvalue())
+    sys.stdout.flush()
+
+def _markdown_snippet(markdown_content: str, verbose: bool, length: int) -> str:
+    """The report preview to print: `length` chars with --verbose, otherwise its size and first line's worth."""
+    if verbose:
+        return markdown_content[:length] + "\n..."
+    return f"({len(markdown_content)} chars) {markdown_content[:80]}..."
+
+def _prompt(prompt: str, preset: str = None, default: str = "") -> str:
+    """Answer a question from its command-line flag if given, else ask; without a terminal, take `default`."""
+    if preset is not None:
+        return preset
+    if not sys.stdin.isatty():
+        return default
+    return input(prompt)
+
+async def test_deep_research_flow(session, company_name: str, verbose: bool = False, mode: str = None, select: str = None, max_wait: int = None):
+    """Runs the test sequence for deep research.
+
+    mode and select pre-answer the interactive questions (see --mode/--select), and max_wait
+    overrides the research wait in minutes, so the flow can run unattended.
+    """
+    wait_kwargs = {"max_wait_minutes": max_wait} if max_wait else {}
+
+    _banner(f"STARTING DEEP RESEARCH TEST FOR COMPANY: {company_name}", sep=_BIGSEP)
+    print()
+    os.makedirs(DOWNLOAD_DIR, exist_ok=True)
 
     # 1. Health Check
-    if not test_health_check():
+    if not await test_health_check(session):
         print("API health check failed. Is the server running at {API_BASE_URL}?")
         sys.exit(1)
 
     # 2. Initiate Analysis & Get Company ID
-    company_id = analyze_company(company_name)
+    company_id = await analyze_company(session, company_name)
     if not company_id:
         print("Failed to initiate company analysis or get ID.")
         sys.exit(1)
 
     # 3. Wait for Competitors
     # Give the initial background task time to identify competitors
-    competitors_list = wait_for_competitors(company_id, max_wait_minutes=5)
+    competitors_list = await wait_for_competitors(session, company_id, max_wait_minutes=5)
     if not competitors_list:
         print("Failed to retrieve competitors.")
         sys.exit(1)
-        
+
     # 4. Ask user whether to research a single competitor or multiple
     print("\nWould you like to research a single competitor or multiple competitors?")
     research_mode = ""
     while research_mode not in ["single", "multiple"]:
-        research_mode = input("Enter 'single' or 'multiple': ").strip().lower()
+        research_mode = _prompt("Enter 'single' or 'multiple': ", mode, default="single").strip().lower()
         if research_mode not in ["single", "multiple"]:
             print("Invalid input. Please enter 'single' or 'multiple'.")
-    
+
     multi_mode = (research_mode == "multiple")
-    
+
     if multi_mode:
         print("Multi-competitor mode selected.")
     else:
@@ -502,22 +668,20 @@ def test_deep_research_flow(company_name: str):
     # 5. Select Competitors
     if multi_mode:
         # For multi mode, allow selecting multiple competitors
-        print("\nAvailable Competitors:")
-        for idx, comp in enumerate(competitors_list):
-            print(f"{idx + 1}. {comp['name']} (ID: {comp['id']})")
+        _print_competitor_list(competitors_list)
 
         selected_competitors = []
         while not selected_competitors:
             try:
-                choices = input(f"Enter the numbers of competitors to research (comma-separated, e.g. '1,3,4') or press Enter for the first two: ")
+                choices = _prompt(f"Enter the numbers of competitors to research (comma-separated, e.g. '1,3,4') or press Enter for the first two: ", select)
                 if not choices:
                     # Default to first two competitors if available
                     selected_competitors = competitors_list[:min(2, len(competitors_list))]
                     break
-                    
+
                 # Parse comma-separated choices
                 choice_indices = [int(c.strip()) - 1 for c in choices.split(',')]
-                
+
                 # Validate all choices
                 if all(0 <= idx < len(competitors_list) for idx in choice_indices):
                     selected_competitors = [competitors_list[idx] for idx in choice_indices]
@@ -525,70 +689,73 @@ def test_deep_research_flow(company_name: str):
                     print("One or more invalid choices. Please try again.")
             except ValueError:
                 print("Invalid input format. Please enter numbers separated by commas.")
-                
+            if not selected_competitors and select is not None:
+                print(f"Invalid --select value: {select}")
+                sys.exit(1)
+
         if not selected_competitors:
             print("No valid competitors selected. Exiting.")
             sys.exit(1)
-            
+
         # Extract IDs
         competitor_ids = [comp['id'] for comp in selected_competitors]
         competitor_names = [comp['name'] for comp in selected_competitors]
-        
+
         print(f"\nSelected {len(competitor_ids)} competitors for research: {', '.join(competitor_names)}")
-        
+
         # 6. Trigger Deep Research
-        if not trigger_multiple_deep_research(competitor_ids):
+        if not await trigger_multiple_deep_research(session, competitor_ids):
             print(f"Failed to trigger deep research for competitors. Check server logs.")
             sys.exit(1)
-            
+
         # 7. Wait for Completion
-        completed_data = check_multiple_research_status(company_id, competitor_ids)
+        completed_data = await check_multiple_research_status(session, competitor_ids, **wait_kwargs)
 
         if not completed_data:
             print(f"Deep research did not complete successfully for any competitors.")
             sys.exit(1) # Exit if nothing completed
 
-        print("\n" + "-"*40)
-        print(f"Deep Research Completed for {len(completed_data)} of {len(competitor_ids)} competitors!")
-        print("-"*40)
+        _banner(f"Deep Research Completed for {len(completed_data)} of {len(competitor_ids)} competitors!")
 
-        # Download individual PDFs
-        download_success_count = 0
+        # Download individual PDFs, all at once
+        # The per-competitor summaries are collected in one buffer and written out together
+        downloads = []
+        buf = io.StringIO()
         for competitor in completed_data:
             markdown_content = competitor.get('deep_research_markdown')
             status = competitor.get('deep_research_status')
             # Only attempt download if status is completed and markdown exists
             if status == 'completed' and markdown_content and not markdown_content.strip().startswith("## Error"):
-                print(f"\nMarkdown Content Snippet for {competitor['name']}:")
-                print(markdown_content[:500] + "\n...")
-                if download_research_pdf(competitor['id'], competitor['name']):
-                     download_success_count += 1
+                print(f"\nMarkdown Content Snippet for {competitor['name']}:", file=buf)
+                print(_markdown_snippet(markdown_content, verbose, 500), file=buf)
+                downloads.append(download_research_pdf(session, competitor['id'], competitor['name']))
             elif status == 'error':
-                 print(f"\nSkipping download for {competitor['name']} due to error status.")
-                 print(f"Error Markdown: {markdown_content[:300]}...")
+                 print(f"\nSkipping download for {competitor['name']} due to error status.", file=buf)
+                 print(f"Error Markdown: {markdown_content[:300]}...", file=buf)
             else:
-                 print(f"\nSkipping download for {competitor['name']} (Status: {status}, Markdown Present: {bool(markdown_content)})")
+                 print(f"\nSkipping download for {competitor['name']} (Status: {status}, Markdown Present: {bool(markdown_content)})", file=buf)
+        sys.stdout.write(buf.getvalue())
+        sys.stdout.flush()
+        download_success_count = sum(1 for ok in await gather_limited(downloads) if ok)
 
         # Download combined PDF only if there were successful individual reports
         if download_success_count > 0:
             completed_ids = [comp['id'] for comp in completed_data if comp.get('deep_research_status') == 'completed' and comp.get('deep_research_markdown') and not comp.get('deep_research_markdown').strip().startswith("## Error")]
             if completed_ids:
-                 download_combined_research_pdf(completed_ids, company_name)
+                 await download_combined_research_pdf(session, completed_ids, company_name)
             else:
                  print("\nNo successfully completed reports to combine for PDF download.")
         else:
             print("\nNo successful individual reports to generate a combined PDF.")
-                
+
     else:
         # For single mode, allow selecting one competitor
-        print("\nAvailable Competitors:")
-        for idx, comp in enumerate(competitors_list):
-            print(f"{idx + 1}. {comp['name']} (ID: {comp['id']})")
-            
+        _print_competitor_list(competitors_list)
+
         selected_idx = -1
         while selected_idx < 0 or selected_idx >= len(competitors_list):
             try:
-                choice = input(f"Enter the number of a competitor to research (1-{len(competitors_list)}) or press Enter for the first one: ")
+                choice = _prompt(f"Enter the number of a competitor to research (1-{len(competitors_list)}) or press Enter for the first one: ", select)
                 if not choice:
                     selected_idx = 0  # Default to first
                     break
@@ -597,48 +764,69 @@ def test_deep_research_flow(company_name: str):
                     print(f"Invalid choice. Please enter a number between 1 and {len(competitors_list)}.")
             except ValueError:
                 print("Invalid input. Please enter a number.")
-                
+            if not 0 <= selected_idx < len(competitors_list) and select is not None:
+                print(f"Invalid --select value: {select}")
+                sys.exit(1)
+
         competitor = competitors_list[selected_idx]
         competitor_id = competitor['id']
         competitor_name = competitor['name']
-        
+
         print(f"\nSelected competitor for research: {competitor_name}")
-        
+
         # 6. Trigger Deep Research
-        if not trigger_deep_research(competitor_id):
+        if not await trigger_deep_research(session, competitor_id):
             print(f"Failed to trigger deep research for {competitor_name}. Check server logs.")
             sys.exit(1)
-            
+
         # 7. Wait for Completion
-        completed_data = check_deep_research_status(company_id, competitor_id)
+        completed_data = await check_deep_research_status(session, company_id, competitor_id, **wait_kwargs)
 
         if not completed_data:
             print(f"Deep research did not complete successfully for {competitor_name}.")
             sys.exit(1)
 
-        print("\n" + "-"*40)
-        print("Deep Research Completed!")
-        print("-"*40)
+        _banner("Deep Research Completed!")
         markdown_content = completed_data.get('deep_research_markdown')
         status = completed_data.get('deep_research_status')
 
         if status == 'completed' and markdown_content and not markdown_content.strip().startswith("## Error"):
             print("Markdown Content Snippet:")
-            print(markdown_content[:1000] + "\n...")
-            download_research_pdf(competitor_id, competitor_name)
+            print(_markdown_snippet(markdown_content, verbose, 1000))
+            await download_research_pdf(session, competitor_id, competitor_name)
         elif status == 'error':
             print(f"Research for {competitor_name} resulted in an error.")
             print(f"Error Markdown: {markdown_content[:500]}...")
         else:
              print(f"Research completed for {competitor_name} but content is missing or invalid (Status: {status}). Cannot download PDF.")
 
-    print("\n" + "="*80)
-    print("DEEP RESEARCH TEST COMPLETED")
-    print("="*80 + "\n")
+    _banner("DEEP RESEARCH TEST COMPLETED", sep=_BIGSEP)
+    print()
+
+async def main(company_name: str, verbose: bool = False, mode: str = None, select: str = None, max_wait: int = None):
+    """Run the deep research test on one client session."""
+    logging.basicConfig(
+        level=os.environ.get("LOG_LEVEL", "INFO").upper(),
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+
+    async with create_session() as session:
+        await test_deep_research_flow(session, company_name, verbose, mode, select, max_wait)
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='Test deep research functionality.')
     parser.add_argument('company_name', nargs='?', default='Microsoft', help='Company name to analyze')
-    
+    parser.add_argument('--verbose', action='store_true', help='Print longer snippets of the research reports')
+    parser.add_argument('--mode', choices=['single', 'multiple'], help='Research mode (skips the prompt)')
+    parser.add_argument('--select', help='Competitor numbers to research, comma-separated and 1-based (skips the prompt)')
+    parser.add_argument('--max-wait', type=int, help='Minutes to wait for the research to complete')
+
     args = parser.parse_args()
-    test_deep_research_flow(args.company_name)
\ No newline at end of file
+    if uvloop is not None:
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    try:
+        asyncio.run(main(args.company_name, args.verbose, args.mode, args.select, args.max_wait))
+    except KeyboardInterrupt:
+        # main()'s session has already been closed while the interrupt unwound it
+        print("\nInterrupted.")
+        sys.exit(130)